@@ -1,113 +1,191 @@
+import re
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy.stats import shapiro, wilcoxon, ttest_rel, f_oneway
+from functools import lru_cache
+from itertools import combinations
+from scipy.stats import shapiro, wilcoxon, ttest_rel, f_oneway, friedmanchisquare
+
+from charts import box_chart, bar_chart, rule_and_sc_facets, render_charts, summary
+from comparison import compare
+from resampling import DEFAULT_RESAMPLES, DEFAULT_SEED
+from strategies import arms_in, order_arms, label, to_long
+
+# === Likert scores from the manual review columns ===
+# Reviewers write e.g. "2 - COT, 1 – RAG": the first "<0-2>-<STRATEGY>" is the
+# score. Any dash counts and spaces are ignored anywhere inside the match, so the
+# raw text is searched as is instead of being normalised row by row first.
+LIKERT_STRATEGIES = ("COT", "RAG")
+LIKERT_COLUMNS = ("completeness", "correctness")
+LIKERT_LEVELS = {0: "0 (Not Fixed)", 1: "1 (Partially Fixed)", 2: "2 (Fully WCAG-Compliant)"}
+
+
+# Strategies (or strategy__model arms) evaluated in the table, from its <prefix>_violation_count columns
+def strategy_labels(df):
+    prefixes = order_arms(arms_in(df.columns, "_violation_count", exclude=("original",)))
+    return {prefix: label(prefix) for prefix in prefixes}
+
+
+def likert_regex(strategy, group=""):
+    return fr"({group}[0-2]) *[-–—] *" + " *".join(re.escape(c) for c in strategy)
+
+
+# Every strategy captured in one pass: one optional lookahead (first match) per strategy
+@lru_cache(maxsize=None)
+def likert_scores_pattern(strategies):
+    return re.compile(
+        "(?s)^" + "".join(fr"(?:(?=.*?{likert_regex(s, f'?P<s{i}>')}))?" for i, s in enumerate(strategies))
+    )
+
+
+LIKERT_PATTERN = likert_scores_pattern(LIKERT_STRATEGIES)
+
+
+@lru_cache(maxsize=None)
+def likert_pattern(strategy):
+    return re.compile(likert_regex(strategy))
+
 
 def extract_likert_score(text, strategy):
-    import re
     if not isinstance(text, str):
         return None
-    text = text.replace('.', ',').replace('–', '-').replace('—', '-')
-    pattern = fr"([0-2])-{strategy}"
-    match = re.search(pattern, text.replace(" ", ""))
+    match = likert_pattern(strategy).search(text)
     return int(match.group(1)) if match else None
 
+
+def extract_likert_scores(df, columns=LIKERT_COLUMNS, strategies=LIKERT_STRATEGIES):
+    # All review columns stacked and parsed with a single str.extract; non-text
+    # cells (numbers, blanks) score None, as in extract_likert_score
+    strategies = tuple(s.upper() for s in strategies)
+    stacked = pd.concat([df[c].astype(object) for c in columns], keys=columns)
+    stacked = stacked.where(stacked.map(lambda v: isinstance(v, str)), "")
+    scores = stacked.str.extract(likert_scores_pattern(strategies)).astype(float)
+    for k, column in enumerate(columns):
+        for i, strategy in enumerate(strategies):
+            df[f"{strategy.lower()}_{column}_score"] = scores[f"s{i}"].to_numpy()[k * len(df):(k + 1) * len(df)]
+    return df
+
+
 def calculate_likert_distribution(score_series):
     total = len(score_series)
     score_counts = score_series.value_counts().to_dict()
-    return {
-        "0 (Not Fixed)": round(score_counts.get(0, 0) / total * 100, 2),
-        "1 (Partially Fixed)": round(score_counts.get(1, 0) / total * 100, 2),
-        "2 (Fully WCAG-Compliant)": round(score_counts.get(2, 0) / total * 100, 2),
-    }
+    return {label: round(score_counts.get(level, 0) / total * 100, 2) for level, label in LIKERT_LEVELS.items()}
+
+
+# === Per-strategy indicator counts in one grouped aggregation ===
+def strategy_counts(df, labels=None):
+    frames = []
+    for prefix, label in (labels or strategy_labels(df)).items():
+        violations = df[f"{prefix}_violation_count"]
+        frame = {
+            "strategy": label,
+            "fixed": (violations < df["original_violation_count"]) & violations.notna(),
+            "new_violations": (violations > df["original_violation_count"]) & violations.notna()
+        }
+        for column in LIKERT_COLUMNS:
+            score = df[f"{prefix}_{column}_score"]
+            for level in LIKERT_LEVELS:
+                frame[f"{column}_{level}"] = score == level
+        frames.append(pd.DataFrame(frame))
+    return pd.concat(frames, ignore_index=True).groupby("strategy", sort=False).sum()
 
-def evaluate_fix_data(filepath):
+
+def likert_distribution(counts, label, column, total):
+    return {name: float(round(counts.at[label, f"{column}_{level}"] / total * 100, 2)) for level, name in LIKERT_LEVELS.items()}
+
+def load_fix_data(filepath):
     df = pd.read_excel(filepath, sheet_name="fix_evaluation_table")
+    return extract_likert_scores(df, strategies=list(strategy_labels(df)))
 
-    df["cot_completeness_score"] = df["completeness"].apply(lambda x: extract_likert_score(x, "COT"))
-    df["rag_completeness_score"] = df["completeness"].apply(lambda x: extract_likert_score(x, "RAG"))
-    df["cot_correctness_score"] = df["correctness"].apply(lambda x: extract_likert_score(x, "COT"))
-    df["rag_correctness_score"] = df["correctness"].apply(lambda x: extract_likert_score(x, "RAG"))
 
-    aligned_df = df.dropna(subset=["cot_violation_count", "rag_violation_count", "cot_compliance_score", "rag_compliance_score"])
+def evaluate_fix_data(filepath):
+    df = load_fix_data(filepath) if isinstance(filepath, str) else filepath
+
+    strategy_label = strategy_labels(df)
+    prefixes = list(strategy_label)
+    labels = list(strategy_label.values())
+    score_columns = [f"{p}_compliance_score" for p in prefixes]
+    violation_columns = [f"{p}_violation_count" for p in prefixes]
+
+    aligned_df = df.dropna(subset=violation_columns + score_columns)
+
+    total = len(df)
+    counts = strategy_counts(df, strategy_label)
+    compliance = df[score_columns].mean()
 
     results = {}
 
-    results["Fix Success Rate (%)"] = {
-        "CoT": round(((df["cot_violation_count"] < df["original_violation_count"]) & df["cot_violation_count"].notna()).sum() / len(df) * 100, 2),
-        "RAG": round(((df["rag_violation_count"] < df["original_violation_count"]) & df["rag_violation_count"].notna()).sum() / len(df) * 100, 2)
-    }
+    results["Fix Success Rate (%)"] = {label: round(counts.at[label, "fixed"] / total * 100, 2) for label in labels}
 
-    results["New Violations Introduced (%)"] = {
-        "CoT": round(((df["cot_violation_count"] > df["original_violation_count"]) & df["cot_violation_count"].notna()).sum() / len(df) * 100, 2),
-        "RAG": round(((df["rag_violation_count"] > df["original_violation_count"]) & df["rag_violation_count"].notna()).sum() / len(df) * 100, 2)
-    }
+    results["New Violations Introduced (%)"] = {label: round(counts.at[label, "new_violations"] / total * 100, 2) for label in labels}
 
     results["Average Compliance Score"] = {
-        "CoT": round(df["cot_compliance_score"].mean(), 2),
-        "RAG": round(df["rag_compliance_score"].mean(), 2)
+        label: round(compliance[f"{prefix}_compliance_score"], 2) for prefix, label in strategy_label.items()
     }
 
     results["Manual Score Distribution"] = {
-        "Fix Completeness (%)": {
-            "CoT": calculate_likert_distribution(df["cot_completeness_score"]),
-            "RAG": calculate_likert_distribution(df["rag_completeness_score"])
-        },
-        "Fix Appropriateness (%)": {
-            "CoT": calculate_likert_distribution(df["cot_correctness_score"]),
-            "RAG": calculate_likert_distribution(df["rag_correctness_score"])
-        }
+        "Fix Completeness (%)": {label: likert_distribution(counts, label, "completeness", total) for label in labels},
+        "Fix Appropriateness (%)": {label: likert_distribution(counts, label, "correctness", total) for label in labels}
     }
 
-    results["Statistical Testing"] = {
+    testing = {
         "Shapiro-Wilk p-values": {
-            "CoT Compliance Score": round(shapiro(aligned_df["cot_compliance_score"]).pvalue, 4),
-            "RAG Compliance Score": round(shapiro(aligned_df["rag_compliance_score"]).pvalue, 4)
-        },
-        "Wilcoxon p-value (Compliance Score)": round(wilcoxon(aligned_df["cot_compliance_score"], aligned_df["rag_compliance_score"]).pvalue, 4),
-        "T-Test p-value (Compliance Score)": round(ttest_rel(aligned_df["cot_compliance_score"], aligned_df["rag_compliance_score"]).pvalue, 4)
+            f"{label} Compliance Score": round(shapiro(aligned_df[f"{prefix}_compliance_score"]).pvalue, 4)
+            for prefix, label in strategy_label.items()
+        }
     }
-
-    anova_data = aligned_df.dropna(subset=["original_violation_count", "cot_violation_count", "rag_violation_count"])
-    results["ANOVA p-value (Violations)"] = round(f_oneway(anova_data["original_violation_count"], anova_data["cot_violation_count"], anova_data["rag_violation_count"]).pvalue, 4)
-
-    # Visualization
-    plt.figure(figsize=(8, 5))
-    sns.boxplot(data=aligned_df[["cot_compliance_score", "rag_compliance_score"]])
-    plt.title("Compliance Score Distribution")
-    plt.ylabel("Score")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("compliance_score_boxplot.png")
-
-    plt.figure(figsize=(8, 5))
-    sns.barplot(x=["Original", "CoT", "RAG"], y=[
-        anova_data["original_violation_count"].mean(),
-        anova_data["cot_violation_count"].mean(),
-        anova_data["rag_violation_count"].mean()
-    ])
-    plt.title("Average Violation Count")
-    plt.ylabel("Count")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("average_violation_barplot.png")
-
-    long_df = pd.melt(anova_data[["original_violation_count", "cot_violation_count", "rag_violation_count"]],
-                      var_name="Fix Type", value_name="Violation Count")
-    plt.figure(figsize=(8, 5))
-    sns.boxplot(data=long_df, x="Fix Type", y="Violation Count")
-    plt.title("Violation Count: Original vs CoT vs RAG")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("violation_count_boxplot.png")
+    if len(prefixes) == 2:
+        a, b = aligned_df[score_columns[0]], aligned_df[score_columns[1]]
+        testing["Wilcoxon p-value (Compliance Score)"] = round(wilcoxon(a, b).pvalue, 4)
+        testing["T-Test p-value (Compliance Score)"] = round(ttest_rel(a, b).pvalue, 4)
+    elif len(prefixes) > 2:
+        # Omnibus test first, then every pair
+        testing["Friedman p-value (Compliance Score)"] = round(friedmanchisquare(*(aligned_df[c] for c in score_columns)).pvalue, 4)
+        pairs = list(combinations(strategy_label.items(), 2))
+        testing["Wilcoxon p-values (Compliance Score)"] = {
+            f"{la} vs {lb}": round(wilcoxon(aligned_df[f"{a}_compliance_score"], aligned_df[f"{b}_compliance_score"]).pvalue, 4)
+            for (a, la), (b, lb) in pairs
+        }
+        testing["T-Test p-values (Compliance Score)"] = {
+            f"{la} vs {lb}": round(ttest_rel(aligned_df[f"{a}_compliance_score"], aligned_df[f"{b}_compliance_score"]).pvalue, 4)
+            for (a, la), (b, lb) in pairs
+        }
+    results["Statistical Testing"] = testing
+
+    count_columns = ["original_violation_count"] + violation_columns
+    anova_data = aligned_df.dropna(subset=count_columns)
+    results["ANOVA p-value (Violations)"] = round(f_oneway(*(anova_data[c] for c in count_columns)).pvalue, 4)
+
+    # Visualization: drawn in worker processes from these summaries, only when they changed
+    charts = [
+        box_chart("compliance_score_boxplot.png", "Compliance Score Distribution", aligned_df, score_columns,
+                  ylabel="Score", grid=True),
+        bar_chart("average_violation_barplot.png", "Average Violation Count", ["Original"] + labels,
+                  [anova_data[c].mean() for c in count_columns], ylabel="Count", grid=True),
+        box_chart("violation_count_boxplot.png", "Violation Count: " + " vs ".join(["Original"] + labels),
+                  anova_data, count_columns, xlabel="Fix Type", ylabel="Violation Count", grid=True)
+    ]
+    charts += rule_and_sc_facets("compliance_score_facets.png", "Average Compliance Score", aligned_df,
+                                 score_columns, labels, ylabel="Score")
+    rendered, unchanged = render_charts(charts)
+    print(f"📊 {summary(rendered, unchanged)}")
 
     return results
 
+
+# === All strategies compared at once: bootstrap CIs, omnibus and pairwise tests (comparison.py) ===
+def comparison_summary(df, resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED):
+    strategy_label = strategy_labels(df)
+    long_df = to_long(df, list(strategy_label), ["compliance_score", "violation_count"])
+    long_df["fixed"] = (long_df["violation_count"] < df["original_violation_count"].to_numpy()[long_df["row"]]) \
+        & long_df["violation_count"].notna()
+    return compare(long_df, "compliance_score", success="fixed", labels=strategy_label,
+                   resamples=resamples, seed=seed)
+
 import json
 
 if __name__ == "__main__":
-    results = evaluate_fix_data("fix_evaluation_table.xlsx")
+    df = load_fix_data("fix_evaluation_table.xlsx")
+    results = evaluate_fix_data(df)
 
     # Print to console
     for section, content in results.items():
@@ -136,3 +214,18 @@ if __name__ == "__main__":
             flat_rows.append({"Metric": section, "Value": content})
 
     pd.DataFrame(flat_rows).to_csv("evaluation_results.csv", index=False)
+
+    # Uncertainty of the strategy comparison, kept out of the results above
+    compared = comparison_summary(df)
+    with open("evaluation_comparison.json", "w") as f_json:
+        json.dump(compared, f_json, indent=2)
+    print(f"\n--- Bootstrap ({compared['resamples']:,} resamples, {compared['confidence']:.0%} CI) ---")
+    for arm in compared["arms"].values():
+        low, high = arm["mean_ci"]
+        s_low, s_high = arm["success_rate_ci"]
+        print(f"{arm['label']}: compliance {arm['mean']:.4f} [{low:.4f}, {high:.4f}], "
+              f"fix success {arm['success_rate']:.4f} [{s_low:.4f}, {s_high:.4f}]")
+    for pair in compared["pairwise"]:
+        low, high = pair["cohens_d_ci"]
+        print(f"{compared['arms'][pair['a']]['label']} vs {compared['arms'][pair['b']]['label']}: "
+              f"d = {pair['cohens_d']:.4f} [{low:.4f}, {high:.4f}], permutation p = {pair['permutation_p_holm']:.4f} (Holm)")
@@ -0,0 +1,192 @@
+import os
+import re
+import queue
+import hashlib
+import threading
+from functools import lru_cache
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from axe_selenium_python import Axe
+
+# === Pool of long-lived headless Chrome sessions for Axe rescans ===
+# Each worker thread owns one driver for the whole run, prepared once (blank
+# page + axe-core injected) and then reused for every document. Jobs are handed out
+# through a queue, a driver that dies mid-scan is replaced and the job retried,
+# and results are returned in job order regardless of which session ran them.
+
+MAX_SESSIONS = os.cpu_count() or 1
+DEFAULT_SESSIONS = min(4, MAX_SESSIONS)
+MAX_RESTARTS = 2
+
+
+def new_driver():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    return webdriver.Chrome(options=options)
+
+
+# === In-memory scanning: axe is injected once per session, documents are swapped in ===
+SCRIPT_TIMEOUT = 120
+
+# document.open() keeps the Window (and the injected axe global) in current
+# browsers; if a page's own scripts clobber it, axe is simply injected again.
+_SWAP_DOCUMENT = """
+document.open();
+document.write(arguments[0]);
+document.close();
+return typeof window.axe !== 'undefined' && typeof window.axe.run === 'function';
+"""
+
+# With an owner attribute (e.g. data-row) every violation/incomplete node is
+# tagged in the browser with the value of its closest element carrying it
+# (node.owner, null outside any), on the live DOM axe actually checked.
+_RUN_AXE = """
+var callback = arguments[arguments.length - 1];
+var target = document.querySelector(arguments[0]) || document;
+var ownerAttr = arguments[2];
+var options = ownerAttr ? Object.assign({}, arguments[1], {elementRef: true}) : arguments[1];
+axe.run(target, options).then(function (results) {
+    if (ownerAttr) {
+        // element references only live in the browser: drop them all before returning
+        var strip = function (node) {
+            delete node.element;
+            ["any", "all", "none"].forEach(function (checks) {
+                (node[checks] || []).forEach(function (check) {
+                    (check.relatedNodes || []).forEach(function (related) { delete related.element; });
+                });
+            });
+        };
+        ["violations", "incomplete", "passes", "inapplicable"].forEach(function (section) {
+            (results[section] || []).forEach(function (rule) {
+                rule.nodes.forEach(function (node) {
+                    if (section === "violations" || section === "incomplete") {
+                        var owner = node.element && node.element.closest ? node.element.closest("[" + ownerAttr + "]") : null;
+                        node.owner = owner ? owner.getAttribute(ownerAttr) : null;
+                    }
+                    strip(node);
+                });
+            });
+        });
+    }
+    callback(results);
+}).catch(function (err) { callback({"error": String(err)}); });
+"""
+
+
+@lru_cache(maxsize=1)
+def axe_source():
+    with open(Axe(None).script_url, "r", encoding="utf8") as f:
+        return f.read()
+
+
+# axe-core version plus a hash of the injected build (used as part of scan cache keys)
+@lru_cache(maxsize=1)
+def axe_build():
+    source = axe_source()
+    match = re.search(r"axe v([\d.]+)", source[:1000])
+    version = match.group(1) if match else "unknown"
+    return f"{version}:{hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]}"
+
+
+def prepare_session(driver):
+    driver.set_script_timeout(SCRIPT_TIMEOUT)
+    driver.get("about:blank")
+    driver.execute_script(axe_source())
+
+
+def axe_version(driver):
+    return driver.execute_script("return window.axe ? axe.version : null;")
+
+
+def scan_html(driver, html, context="main#axe-scan-target", options=None, owner_attr=None):
+    if not driver.execute_script(_SWAP_DOCUMENT, html):
+        driver.execute_script(axe_source())
+    result = driver.execute_async_script(_RUN_AXE, context, options or {}, owner_attr)
+    if isinstance(result, dict) and "error" in result and "violations" not in result:
+        raise RuntimeError(f"axe.run failed: {result['error']}")
+    return result
+
+
+# Starts the browser on first use, so jobs answered from a cache never launch Chrome
+class _LazyDriver:
+    def __init__(self, factory, setup):
+        self._factory = factory
+        self._setup = setup
+        self._driver = None
+
+    def __getattr__(self, name):
+        if self._driver is None:
+            driver = self._factory()
+            if self._setup is not None:
+                self._setup(driver)
+            self._driver = driver
+        return getattr(self._driver, name)
+
+    def quit(self):
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            driver.quit()
+
+
+class BrowserPool:
+    def __init__(self, sessions=DEFAULT_SESSIONS, driver_factory=new_driver, setup=prepare_session,
+                 max_restarts=MAX_RESTARTS):
+        self.sessions = max(1, min(sessions, MAX_SESSIONS))
+        self.driver_factory = driver_factory
+        self.setup = setup
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._lock = threading.Lock()
+
+    def _worker(self, jobs, results, scan):
+        driver = _LazyDriver(self.driver_factory, self.setup)
+        try:
+            while True:
+                try:
+                    index, job = jobs.get_nowait()
+                except queue.Empty:
+                    return
+
+                attempts = 0
+                while True:
+                    try:
+                        results[index] = scan(driver, job)
+                        break
+                    except WebDriverException as e:
+                        # The session may be gone (crash, hung renderer): replace it and retry
+                        try:
+                            driver.quit()
+                        except Exception:
+                            pass
+                        with self._lock:
+                            self.restarts += 1
+                        attempts += 1
+                        if attempts > self.max_restarts:
+                            results[index] = e
+                            break
+                    except Exception as e:
+                        results[index] = e
+                        break
+        finally:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    # Runs scan(driver, job) for every job; a failed job yields its exception in place of a result
+    def map(self, scan, jobs):
+        jobs = list(jobs)
+        results = [None] * len(jobs)
+        work = queue.Queue()
+        for index, job in enumerate(jobs):
+            work.put((index, job))
+
+        threads = [
+            threading.Thread(target=self._worker, args=(work, results, scan), daemon=True)
+            for _ in range(min(self.sessions, len(jobs)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
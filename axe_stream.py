@@ -0,0 +1,201 @@
+import re
+import json
+
+# === Streaming reader for Axe reports ===
+# Walks the report text in fixed-size chunks and only decodes the rule objects
+# of the requested result sections. Everything else ("passes", "inapplicable",
+# page metadata, nodes of rules that are filtered out) is skipped by bracket
+# matching without being materialised, so memory stays bounded by the chunk
+# size plus the largest single retained rule.
+
+CHUNK_SIZE = 1 << 20
+
+_WS = re.compile(r"\s*")
+_STRING_TAIL = re.compile(r'(?:[^"\\]|\\.)*"', re.S)
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_SCALAR = re.compile(r"[^,\]}\s]*")
+
+
+class _ChunkReader:
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.keep = None  # buffer offset that must survive compaction (capture start)
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        start = self.pos if self.keep is None else self.keep
+        if start:
+            self.buf = self.buf[start:]
+            self.pos -= start
+            if self.keep is not None:
+                self.keep = 0
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON report")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def _skip_string(self):
+        # self.pos sits just after the opening quote
+        while True:
+            match = _STRING_TAIL.match(self.buf, self.pos)
+            if match:
+                self.pos = match.end()
+                return
+            if not self._fill():
+                raise ValueError("Unterminated string in JSON report")
+
+    def skip_value(self):
+        char = self.peek()
+        if char == '"':
+            self.pos += 1
+            self._skip_string()
+            return
+        if char in "{[":
+            self.pos += 1
+            depth = 1
+            while depth:
+                match = _STRUCTURAL.search(self.buf, self.pos)
+                if not match:
+                    self.pos = len(self.buf)
+                    if not self._fill():
+                        raise ValueError("Unterminated container in JSON report")
+                    continue
+                self.pos = match.end()
+                found = match.group()
+                if found == '"':
+                    self._skip_string()
+                elif found in "{[":
+                    depth += 1
+                else:
+                    depth -= 1
+            return
+        while True:
+            match = _SCALAR.match(self.buf, self.pos)
+            if match.end() < len(self.buf) or not self._fill():
+                self.pos = match.end()
+                return
+
+    def read_value(self):
+        self.peek()
+        self.keep = self.pos
+        try:
+            self.skip_value()
+            return json.loads(self.buf[self.keep:self.pos])
+        finally:
+            self.keep = None
+
+    def iter_object(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Malformed object at offset {self.pos}")
+
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Malformed array at offset {self.pos}")
+
+
+def _read_rule(reader, keep):
+    # Scalars and small fields are decoded as they come; "nodes" is only decoded
+    # when the rule can still be kept (Axe writes id/impact before nodes).
+    if reader.peek() != "{":
+        reader.skip_value()
+        return None
+    rule = {}
+    for key in reader.iter_object():
+        if key == "nodes" and "id" in rule and "impact" in rule and not keep(rule):
+            reader.skip_value()
+        else:
+            rule[key] = reader.read_value()
+    return rule if keep(rule) else None
+
+
+def _iter_sections(reader, sections, keep):
+    for key in reader.iter_object():
+        if key in sections and reader.peek() == "[":
+            for _ in reader.iter_array():
+                rule = _read_rule(reader, keep)
+                if rule is not None:
+                    yield key, rule
+        else:
+            reader.skip_value()
+
+
+# === Public API ===
+# Yields (section, rule) for every rule of the requested sections that passes
+# `keep`. Sections are read from the "accessibility" object; with top_level=True
+# unwrapped reports (sections at the document root) are read as well.
+def iter_rules(file_path, sections=("violations",), keep=None, top_level=False, chunk_size=CHUNK_SIZE):
+    if keep is None:
+        keep = lambda rule: True
+    sections = set(sections)
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        reader = _ChunkReader(f, chunk_size)
+        if reader.peek() != "{":
+            reader.skip_value()
+            return
+        for key in reader.iter_object():
+            if key == "accessibility" and reader.peek() == "{":
+                yield from _iter_sections(reader, sections, keep)
+            elif top_level and key in sections and reader.peek() == "[":
+                for _ in reader.iter_array():
+                    rule = _read_rule(reader, keep)
+                    if rule is not None:
+                        yield key, rule
+            else:
+                reader.skip_value()
+
+
+def critical_rule_filter(wcag_rules):
+    wanted = {rule for sc_data in wcag_rules.values() for rule in sc_data["rules"]}
+
+    def keep(rule):
+        rule_id = rule.get("id")
+        impact = rule.get("impact")
+        return (
+            isinstance(rule_id, str) and rule_id.lower() in wanted
+            and isinstance(impact, str) and impact.lower() == "critical"
+        )
+
+    return keep
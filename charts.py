@@ -0,0 +1,211 @@
+import os
+import json
+import math
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+
+# === Headless chart rendering from precomputed summaries ===
+# Charts are described as small specs (kind, titles, and the numbers to draw:
+# box statistics, bar heights), computed once from the data in the calling
+# process. Specs are drawn on explicit matplotlib Figures (Agg canvas, no
+# pyplot state, nothing left open) in a pool of worker processes. Each chart's
+# spec hash is kept in HASH_FILE next to the images, so a chart is only redrawn
+# when its summary changed or its file is missing.
+# Facet charts (one panel per rule or success criterion) are built from one
+# groupby over the wide table and split into pages of FACETS_PER_FIGURE panels.
+
+CHART_VERSION = 1  # part of every hash: bump when the drawing code changes
+HASH_FILE = ".chart_hashes.json"
+MAX_FLIERS = 200  # outlier points drawn per box (evenly thinned beyond that)
+FACETS_PER_FIGURE = 24
+FACET_COLUMNS = 6
+# seaborn's "deep" palette, so charts look as they did when drawn with seaborn
+PALETTE = ["#4C72B0", "#DD8452", "#55A868", "#C44E52", "#8172B3",
+           "#937860", "#DA8BC3", "#8C8C8C", "#CCB974", "#64B5CD"]
+
+
+def _color(i):
+    return PALETTE[i % len(PALETTE)]
+
+
+# === Summaries (computed in the calling process) ===
+def box_stats(values):
+    # Tukey box (1.5 IQR whiskers) of one column, NaN dropped
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    fliers = np.unique(values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)])
+    if len(fliers) > MAX_FLIERS:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, MAX_FLIERS).round().astype(int)]
+    return {
+        "med": float(med), "q1": float(q1), "q3": float(q3),
+        "whislo": float(inside.min()), "whishi": float(inside.max()),
+        "fliers": fliers.tolist(), "n": int(len(values))
+    }
+
+
+def box_chart(name, title, df, columns, labels=None, ylabel=None, xlabel=None, figsize=(8, 5), grid=False):
+    return {
+        "kind": "box", "name": name, "title": title, "ylabel": ylabel, "xlabel": xlabel,
+        "figsize": list(figsize), "grid": grid,
+        "labels": list(labels or columns), "stats": [box_stats(df[c]) for c in columns]
+    }
+
+
+def bar_chart(name, title, labels, values, ylabel=None, xlabel=None, figsize=(8, 5), grid=False):
+    return {
+        "kind": "bar", "name": name, "title": title, "ylabel": ylabel, "xlabel": xlabel,
+        "figsize": list(figsize), "grid": grid,
+        "labels": list(labels), "values": [float(v) for v in values]
+    }
+
+
+def facet_charts(name, title, df, facet, columns, labels=None, ylabel=None, min_rows=1):
+    # Mean of every column per facet value (e.g. rule_id), largest facets first,
+    # as pages of bar panels: <name>.png, or <name>_1.png, <name>_2.png, ...
+    if facet not in df.columns or df.empty:
+        return []
+    grouped = df.groupby(facet, sort=False)[list(columns)]
+    means = grouped.mean()
+    counts = grouped.size()
+    order = counts[counts >= min_rows].sort_values(ascending=False, kind="stable").index
+    if not len(order):
+        return []
+    means, counts = means.loc[order], counts.loc[order]
+    panels = [
+        {"facet": str(key), "n": int(n), "values": [None if np.isnan(v) else float(v) for v in row]}
+        for key, n, row in zip(order, counts.to_numpy(), means.to_numpy(dtype=np.float64))
+    ]
+    pages = [panels[i:i + FACETS_PER_FIGURE] for i in range(0, len(panels), FACETS_PER_FIGURE)]
+    specs = []
+    for page_no, page in enumerate(pages, start=1):
+        suffix = f"_{page_no}" if len(pages) > 1 else ""
+        root, ext = os.path.splitext(name)
+        specs.append({
+            "kind": "facet_bar", "name": f"{root}{suffix}{ext}",
+            "title": f"{title} ({page_no}/{len(pages)})" if len(pages) > 1 else title,
+            "ylabel": ylabel, "facet": facet, "labels": list(labels or columns), "panels": page
+        })
+    return specs
+
+
+# Per-rule and per-success-criterion facets of the same columns
+SC_COLUMNS = ("WCAG_SC", "wcag_guideline")
+
+
+def rule_and_sc_facets(name, title, df, columns, labels=None, ylabel=None, min_rows=1):
+    root, ext = os.path.splitext(name)
+    specs = facet_charts(f"{root}_by_rule{ext}", f"{title} by Rule", df, "rule_id", columns, labels, ylabel, min_rows)
+    sc = next((c for c in SC_COLUMNS if c in df.columns), None)
+    if sc is not None:
+        specs += facet_charts(f"{root}_by_sc{ext}", f"{title} by WCAG SC", df, sc, columns, labels, ylabel, min_rows)
+    return specs
+
+
+# === Drawing (runs in the worker processes) ===
+def _finish(ax, spec):
+    ax.set_title(spec.get("title") or "")
+    if spec.get("ylabel"):
+        ax.set_ylabel(spec["ylabel"])
+    if spec.get("xlabel"):
+        ax.set_xlabel(spec["xlabel"])
+    if spec.get("grid"):
+        ax.grid(True)
+
+
+def draw(spec):
+    kind = spec["kind"]
+    if kind == "facet_bar":
+        panels = spec["panels"]
+        ncols = min(FACET_COLUMNS, len(panels))
+        nrows = math.ceil(len(panels) / ncols)
+        fig = Figure(figsize=(2.6 * ncols, 2.4 * nrows + 0.6))
+        axes = fig.subplots(nrows, ncols, sharey=True, squeeze=False).ravel()
+        positions = np.arange(len(spec["labels"]))
+        for ax, panel in zip(axes, panels):
+            heights = [np.nan if v is None else v for v in panel["values"]]
+            ax.bar(positions, heights, color=[_color(i) for i in positions])
+            ax.set_title(f"{panel['facet']} (n={panel['n']:,})", fontsize=9)
+            ax.set_xticks(positions, spec["labels"], fontsize=8, rotation=30 if len(positions) > 3 else 0)
+        for ax in axes[len(panels):]:
+            ax.set_visible(False)
+        for ax in axes[::ncols]:
+            if spec.get("ylabel"):
+                ax.set_ylabel(spec["ylabel"])
+        fig.suptitle(spec["title"])
+        fig.tight_layout()
+        return fig
+
+    fig = Figure(figsize=spec["figsize"])
+    ax = fig.subplots()
+    positions = np.arange(len(spec["labels"]))
+    if kind == "box":
+        boxes = [dict(stats, label=label) for stats, label in zip(spec["stats"], spec["labels"]) if stats is not None]
+        drawn = [i for i, stats in enumerate(spec["stats"]) if stats is not None]
+        if boxes:
+            artists = ax.bxp(boxes, positions=drawn, widths=0.8, patch_artist=True,
+                             medianprops={"color": "#3d3d3d"},
+                             flierprops={"marker": "d", "markersize": 4, "markerfacecolor": "#3d3d3d"})
+            for i, patch in zip(drawn, artists["boxes"]):
+                patch.set_facecolor(_color(i))
+        ax.set_xticks(positions, spec["labels"])
+    elif kind == "bar":
+        ax.bar(positions, spec["values"], color=[_color(i) for i in positions])
+        ax.set_xticks(positions, spec["labels"])
+    else:
+        raise ValueError(f"Unknown chart kind: {kind}")
+    _finish(ax, spec)
+    fig.tight_layout()
+    return fig
+
+
+def _render(job):
+    spec, path = job
+    fig = draw(spec)
+    fig.savefig(path)
+    return spec["name"]
+
+
+def spec_hash(spec):
+    return hashlib.sha256(json.dumps([CHART_VERSION, spec], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# === Render every stale chart in parallel; returns (rendered, unchanged) names ===
+def render_charts(specs, output_dir=".", workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    hash_path = os.path.join(output_dir, HASH_FILE)
+    known = {}
+    if os.path.exists(hash_path):
+        with open(hash_path, "r", encoding="utf-8") as f:
+            known = json.load(f)
+
+    hashes = {spec["name"]: spec_hash(spec) for spec in specs}
+    stale = [
+        spec for spec in specs
+        if known.get(spec["name"]) != hashes[spec["name"]] or not os.path.exists(os.path.join(output_dir, spec["name"]))
+    ]
+    jobs = [(spec, os.path.join(output_dir, spec["name"])) for spec in stale]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render, jobs))
+    else:
+        rendered = [_render(job) for job in jobs]
+
+    known.update({name: hashes[name] for name in rendered})
+    tmp_path = hash_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(known, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, hash_path)
+    unchanged = [spec["name"] for spec in specs if spec["name"] not in set(rendered)]
+    return rendered, unchanged
+
+
+def summary(rendered, unchanged):
+    return f"{len(rendered)} chart(s) rendered, {len(unchanged)} unchanged"
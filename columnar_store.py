@@ -0,0 +1,209 @@
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# === Columnar interchange store between pipeline stages ===
+# Every stage keeps addressing its data by the familiar .csv/.xlsx name; the
+# canonical copy lives next to it as .parquet and the CSV/XLSX is only written
+# as an export view. Low-cardinality columns are stored dictionary-encoded and
+# readers can project columns so large blobs (html, nodes, responses) are never
+# decoded by stages that don't need them.
+# A CSV/XLSX that is newer than its Parquet copy (edited by hand, or written by
+# an older script) wins: readers fall back to it until the Parquet is rewritten.
+
+DICTIONARY_COLUMNS = [
+    "rule_id", "WCAG_SC", "impact", "wcag_guideline", "wcag_description", "wcag_url", "fix_type",
+    "arm", "strategy", "model", "fix_source"
+]
+BLOB_COLUMNS = ["html", "nodes", "cot_prompt", "rag_prompt", "cot_response", "rag_response"]
+
+
+def parquet_path(path):
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def has_parquet(path):
+    try:
+        parquet_mtime = os.stat(parquet_path(path)).st_mtime_ns
+    except OSError:
+        return False
+    try:
+        return parquet_mtime >= os.stat(path).st_mtime_ns
+    except OSError:
+        return True
+
+
+def _mark_current(path):
+    # The Parquet copy is written before its export view; stamp it afterwards so
+    # the pair reads as in sync and only a later edit of the export overrides it
+    os.utime(parquet_path(path))
+
+
+def _to_arrow(df):
+    arrays = []
+    for name in df.columns:
+        series = df[name]
+        try:
+            array = pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed object columns (e.g. numbers and "" after fillna) are stored as text;
+            # missing values stay null instead of becoming "nan"/"None"
+            array = pa.array(series.astype(str).where(series.notna(), None), from_pandas=True)
+        if name in DICTIONARY_COLUMNS and (pa.types.is_string(array.type) or pa.types.is_large_string(array.type)):
+            array = pc.dictionary_encode(array)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=[str(name) for name in df.columns])
+
+
+def _to_pandas(table):
+    # Dictionary columns are decoded back to plain strings so existing pandas code
+    # (fillna(""), string comparisons) behaves exactly as with the CSV input.
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, pc.cast(table.column(i), field.type.value_type))
+    return table.to_pandas()
+
+
+# === Write: canonical Parquet plus optional CSV/XLSX export view ===
+def write_table(df, path, export=True, **export_kwargs):
+    pq.write_table(_to_arrow(df), parquet_path(path), compression="zstd")
+    if not export:
+        return
+    if path.endswith(".xlsx"):
+        df.to_excel(path, index=False, **export_kwargs)
+    elif path.endswith(".csv"):
+        df.to_csv(path, **{"index": False, **export_kwargs})
+    _mark_current(path)
+
+
+def _is_text(t):
+    return pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_dictionary(t)
+
+
+def _widen(old, new):
+    # Smallest common column type of two chunks: null gives way, numbers widen to
+    # float, anything else (e.g. int then str) becomes text
+    if old == new or pa.types.is_null(new):
+        return old
+    if pa.types.is_null(old):
+        return new
+    if (pa.types.is_integer(old) or pa.types.is_floating(old)) and (pa.types.is_integer(new) or pa.types.is_floating(new)):
+        return pa.float64()
+    if pa.types.is_dictionary(old) or pa.types.is_dictionary(new):
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def _cast(table, schema):
+    # Column by column, so numbers/booleans that become text are formatted by Arrow
+    columns = []
+    for i, field in enumerate(schema):
+        column = table.column(i)
+        if column.type != field.type and _is_text(field.type) and pa.types.is_dictionary(column.type):
+            column = pc.cast(column, column.type.value_type)
+        if column.type != field.type and pa.types.is_dictionary(field.type):
+            column = pc.dictionary_encode(pc.cast(column, pa.string()))
+        columns.append(pc.cast(column, field.type) if column.type != field.type else column)
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+# === Streaming write: append DataFrame chunks to the Parquet copy and the CSV export ===
+# Produces the same files as write_table() on the concatenated frame without
+# holding it in memory: the CSV header is written with the first chunk only.
+# Chunks are cast to the file's schema; when a later chunk needs a wider column
+# type (e.g. a column that was all numbers turns out to hold text), the rows
+# written so far are rewritten once with the widened schema.
+class TableWriter:
+    def __init__(self, path, export=True, **export_kwargs):
+        self.path = path
+        self.export = export and path.endswith(".csv")
+        self.export_kwargs = {"index": False, **export_kwargs}
+        self.rows = 0
+        self._parquet = None
+
+    def write(self, df):
+        table = _to_arrow(df)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(parquet_path(self.path), table.schema, compression="zstd")
+        elif table.schema != self._parquet.schema:
+            table = self._conform(table)
+        self._parquet.write_table(table)
+        if self.export:
+            first = self.rows == 0
+            df.to_csv(self.path, mode="w" if first else "a", header=first, **self.export_kwargs)
+        self.rows += len(df)
+
+    def _conform(self, table):
+        schema = self._parquet.schema
+        try:
+            return _cast(table, schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            pass
+        widened = pa.schema([
+            pa.field(field.name, _widen(field.type, new.type)) for field, new in zip(schema, table.schema)
+        ])
+        # Re-open the file with the widened schema and carry over the rows written so far
+        path = parquet_path(self.path)
+        self._parquet.close()
+        written = pq.read_table(path)
+        self._parquet = pq.ParquetWriter(path, widened, compression="zstd")
+        if written.num_rows:
+            self._parquet.write_table(_cast(written, widened))
+        return _cast(table, widened)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            _mark_current(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# === Read: Parquet when present, legacy CSV/XLSX otherwise ===
+def table_columns(path):
+    if has_parquet(path):
+        return pq.read_schema(parquet_path(path)).names
+    if path.endswith(".xlsx"):
+        return list(pd.read_excel(path, nrows=0).columns)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_table(path, columns=None):
+    if has_parquet(path):
+        return _to_pandas(pq.read_table(parquet_path(path), columns=columns))
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path, usecols=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def read_rows(path, positions, columns=None):
+    # Full rows for the given 0-based row positions, in the order given
+    if has_parquet(path):
+        table = pq.read_table(parquet_path(path), columns=columns)
+        return _to_pandas(table.take(pa.array(positions, type=pa.int64())))
+    return read_table(path, columns).iloc[list(positions)].reset_index(drop=True)
+
+
+def iter_batches(path, columns=None, batch_size=65536):
+    if has_parquet(path):
+        for batch in pq.ParquetFile(parquet_path(path)).iter_batches(batch_size=batch_size, columns=columns):
+            yield _to_pandas(pa.Table.from_batches([batch]))
+    elif path.endswith(".xlsx"):
+        yield read_table(path, columns)
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=batch_size)
+
+
+# === CLI: convert an existing CSV/XLSX stage file into its canonical Parquet copy ===
+if __name__ == "__main__":
+    for source in sys.argv[1:]:
+        frame = pd.read_excel(source) if source.endswith(".xlsx") else pd.read_csv(source)
+        write_table(frame, source, export=False)
+        print(f"✅ {source} → {parquet_path(source)} ({len(frame):,} rows)")
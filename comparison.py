@@ -0,0 +1,124 @@
+import itertools
+import numpy as np
+from scipy.stats import chi2, f_oneway, friedmanchisquare, ttest_rel, wilcoxon
+
+from resampling import bootstrap_sums, permutation_test, percentile_ci, cohens_d, DEFAULT_RESAMPLES, DEFAULT_SEED, CONFIDENCE
+
+# === Comparison engine for any number of arms (strategy x model) ===
+# Input is long format: one row per (row, arm) with a score and optionally a
+# 0/1 success flag. Rows scored for every arm form the paired sample. One
+# bootstrap pass resamples those rows jointly for every arm and every pair:
+# the column sums W @ X cover arm scores, success flags and pairwise squared
+# differences. On top come the omnibus tests (Friedman, one-way ANOVA,
+# Cochran's Q on success) and the pairwise tests (Wilcoxon, paired t,
+# sign-flip permutation) with Holm-adjusted permutation p-values.
+
+
+def _float(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _pvalue(test, *samples):
+    try:
+        return _float(test(*samples).pvalue)
+    except ValueError:
+        return None  # e.g. Wilcoxon with all differences zero
+
+
+def cochran_q(flags):
+    # flags: (rows x arms) 0/1 matrix
+    m = flags.shape[1]
+    totals = flags.sum(axis=0)
+    per_row = flags.sum(axis=1)
+    n = totals.sum()
+    denominator = m * n - (per_row ** 2).sum()
+    if denominator == 0:
+        return None
+    q = (m - 1) * (m * (totals ** 2).sum() - n ** 2) / denominator
+    return _float(chi2.sf(q, m - 1))
+
+
+def holm(pvalues):
+    order = np.argsort(pvalues)
+    adjusted = np.empty(len(pvalues))
+    running = 0.0
+    for rank, i in enumerate(order):
+        running = max(running, min(1.0, (len(pvalues) - rank) * pvalues[i]))
+        adjusted[i] = running
+    return adjusted.tolist()
+
+
+def compare(long_df, score, success=None, row="row", arm="arm", labels=None,
+            resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, confidence=CONFIDENCE):
+    arm_list = list(dict.fromkeys(long_df[arm]))
+    labels = labels or {}
+    wide = long_df.pivot(index=row, columns=arm, values=score)[arm_list].astype(float).dropna()
+    scores = wide.to_numpy(dtype=np.float64)
+    n, m = scores.shape
+    flags = None
+    if success is not None:
+        flags = (
+            long_df.pivot(index=row, columns=arm, values=success)[arm_list]
+            .reindex(wide.index).fillna(False).astype(float).to_numpy()
+        )
+    pairs = list(itertools.combinations(range(m), 2))
+
+    result = {"score": score, "n": n, "arms": {}, "omnibus": {}, "pairwise": [],
+              "resamples": resamples, "seed": seed, "confidence": confidence}
+    if n < 2:
+        return result
+
+    # === One bootstrap pass: arm scores, success flags and pairwise squared differences ===
+    blocks = [scores] + ([flags] if flags is not None else [])
+    blocks.append(np.column_stack([(scores[:, i] - scores[:, j]) ** 2 for i, j in pairs]) if pairs else np.empty((n, 0)))
+    sums = bootstrap_sums(np.hstack(blocks), resamples, seed)
+    boot_means = sums[:, :m] / n
+    boot_success = sums[:, m:2 * m] / n if flags is not None else None
+    boot_d2 = sums[:, (2 * m if flags is not None else m):]
+
+    for k, name in enumerate(arm_list):
+        entry = {
+            "label": labels.get(name, name),
+            "mean": _float(scores[:, k].mean()),
+            "mean_ci": percentile_ci(boot_means[:, k], confidence)
+        }
+        if flags is not None:
+            entry["success_rate"] = _float(flags[:, k].mean())
+            entry["success_rate_ci"] = percentile_ci(boot_success[:, k], confidence)
+        result["arms"][name] = entry
+
+    columns = [scores[:, k] for k in range(m)]
+    if m >= 3:
+        result["omnibus"]["friedman_p"] = _pvalue(friedmanchisquare, *columns)
+    if m >= 2:
+        result["omnibus"]["anova_p"] = _pvalue(f_oneway, *columns)
+        if flags is not None:
+            result["omnibus"]["cochran_q_p"] = cochran_q(flags)
+
+    permutation_ps = []
+    for p, (i, j) in enumerate(pairs):
+        diff = scores[:, i] - scores[:, j]
+        boot_diff = boot_means[:, i] - boot_means[:, j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = (boot_d2[:, p] - n * boot_diff ** 2) / (n - 1)
+            boot_effect = np.where(variance > 0, boot_diff / np.sqrt(np.clip(variance, 0, None)), 0.0)
+        entry = {
+            "a": arm_list[i],
+            "b": arm_list[j],
+            "mean_difference": _float(diff.mean()),
+            "mean_difference_ci": percentile_ci(boot_diff, confidence),
+            "cohens_d": cohens_d(scores[:, i], scores[:, j]),
+            "cohens_d_ci": percentile_ci(boot_effect, confidence),
+            "wilcoxon_p": _pvalue(wilcoxon, scores[:, i], scores[:, j]),
+            "ttest_p": _pvalue(ttest_rel, scores[:, i], scores[:, j]),
+            "permutation_p": permutation_test(diff, resamples, seed + 1 + p)
+        }
+        if flags is not None:
+            entry["success_rate_difference"] = _float(flags[:, i].mean() - flags[:, j].mean())
+            entry["success_rate_difference_ci"] = percentile_ci(boot_success[:, i] - boot_success[:, j], confidence)
+        permutation_ps.append(entry["permutation_p"])
+        result["pairwise"].append(entry)
+    for entry, adjusted in zip(result["pairwise"], holm(permutation_ps) if permutation_ps else []):
+        entry["permutation_p_holm"] = adjusted
+    return result
@@ -0,0 +1,65 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# === Persistent cache of LLM completions ===
+# Keyed on the model name, the sampling parameters and the exact messages sent,
+# so a re-run after editing hints or evaluation code only pays for prompts whose
+# text actually changed. Hits are counted together with the tokens they saved.
+
+
+def completion_key(model, params, messages):
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(params or {}, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CompletionCache:
+    def __init__(self, db_path):
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                usage TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+        """)
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT content, usage FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            usage = json.loads(row[1])
+            self.hits += 1
+            self.tokens_saved += usage.get("total_tokens", 0)
+            return {"content": row[0], "usage": usage}
+
+    def put(self, key, model, result):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, usage, created) VALUES (?, ?, ?, ?, ?)",
+                (key, model, result["content"], json.dumps(result.get("usage") or {}), time.time())
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"{self.hits:,} hits / {self.misses:,} misses ({rate:.1f}% hit rate), {self.tokens_saved:,} tokens saved"
@@ -1,8 +1,17 @@
 import os
 import json
+import argparse
 import pandas as pd
 from bs4 import BeautifulSoup
 
+from page_model import load_page, partition_overlapping
+from strategies import arms_in
+
+parser = argparse.ArgumentParser(description="Embed every strategy's fixes into copies of their source pages")
+parser.add_argument("--per-page", action="store_true",
+                    help="write one document per source page and strategy with every non-overlapping fix applied")
+args = parser.parse_args()
+
 # === Paths ===
 input_file = r"results_cot_rag_generated.json"
 output_dir = os.path.join(os.path.dirname(input_file), "html_fixes_embedded")
@@ -14,80 +23,119 @@ success_log = []
 with open(input_file, "r", encoding="utf-8") as f:
     data = json.load(f)
 
+# One variant per <arm>_response column (cot, rag, ... or strategy__model)
+fix_types = arms_in(data[0].keys() if data else [], "_response")
+
 # === Utilities ===
-def approximate_match(soup, snippet):
-    snippet_tag = BeautifulSoup(snippet, "html.parser").find()
-    if not snippet_tag:
-        return None
-
-    tag_name = snippet_tag.name
-    id_val = snippet_tag.get("id")
-    role_val = snippet_tag.get("role")
-    aria_attrs = {k: v for k, v in snippet_tag.attrs.items() if k.startswith("aria-")}
-
-    candidates = soup.find_all(tag_name)
-    for tag in candidates:
-        if id_val and tag.get("id") == id_val:
-            return tag
-        if role_val and tag.get("role") == role_val:
-            return tag
-        if any(tag.get(k) == v for k, v in aria_attrs.items()):
-            return tag
-    return None
-
-def wrap_fixed_html(fixed_html, data_source="cot"):
-    return f'<section data-source="{data_source}">\n{fixed_html.strip()}\n</section>'
+def approximate_match(page, snippet, target=None):
+    # Indexed lookup (Axe target, id, role, aria-*); tag-only guesses are not used
+    return page.index.locate(snippet, target)
 
-# === Process ===
-for idx, row in enumerate(data):
-    html_path = row.get("html_file_path", "")
-    if not html_path or not os.path.isfile(html_path):
-        fail_log.append({"index": idx, "reason": "Missing or invalid HTML file path"})
-        continue
+def wrap_fixed_html(fixed_html, data_source="cot", row=None):
+    row_attr = f' data-row="{row}"' if row is not None else ""
+    return f'<section data-source="{data_source}"{row_attr}>\n{fixed_html.strip()}\n</section>'
 
+def embed_row(idx, row):
+    html_path = row.get("html_file_path", "")
     try:
-        with open(html_path, "r", encoding="utf-8") as f:
-            original_html = f.read()
-        soup = BeautifulSoup(original_html, "html.parser")
+        # Parsed once per page (LRU shared across rows); variants are spliced as text
+        page = load_page(html_path)
 
         old_fragment = row.get("html", "")
-        cot_fix = row.get("cot_response", "")
-        rag_fix = row.get("rag_response", "")
-
-        cot_section = BeautifulSoup(wrap_fixed_html(cot_fix, "cot"), "html.parser")
-        rag_section = BeautifulSoup(wrap_fixed_html(rag_fix, "rag"), "html.parser")
-
-        soup_cot = BeautifulSoup(str(soup), "html.parser")
-        soup_rag = BeautifulSoup(str(soup), "html.parser")
-
-        match_cot = approximate_match(soup_cot, old_fragment)
-        match_rag = approximate_match(soup_rag, old_fragment)
-
-        if match_cot:
-            match_cot.replace_with(cot_section)
-        else:
-            soup_cot.body.append(cot_section)
-
-        if match_rag:
-            match_rag.replace_with(rag_section)
-        else:
-            soup_rag.body.append(rag_section)
-
-        cot_path = os.path.join(output_dir, f"fix_cot_{idx}.html")
-        rag_path = os.path.join(output_dir, f"fix_rag_{idx}.html")
-
-        with open(cot_path, "w", encoding="utf-8") as f:
-            f.write(str(soup_cot))
-        with open(rag_path, "w", encoding="utf-8") as f:
-            f.write(str(soup_rag))
-
-        success_log.append({"index": idx, "cot_path": cot_path, "rag_path": rag_path})
+        sections = {
+            fix_type: BeautifulSoup(wrap_fixed_html(row.get(f"{fix_type}_response", ""), fix_type), "html.parser")
+            for fix_type in fix_types
+        }
+
+        with page.lock:
+            match = approximate_match(page, old_fragment, row.get("target"))
+            node = match.node if match else None
+            if node is None and page.soup.body is None:
+                raise ValueError("Page has no <body> to append the fix to")
+            variants = {fix_type: page.render(node, str(section)) for fix_type, section in sections.items()}
+
+        paths = {}
+        for fix_type, variant_html in variants.items():
+            paths[fix_type] = os.path.join(output_dir, f"fix_{fix_type}_{idx}.html")
+            with open(paths[fix_type], "w", encoding="utf-8") as f:
+                f.write(variant_html)
+
+        success_log.append({
+            "index": idx, **{f"{fix_type}_path": path for fix_type, path in paths.items()},
+            "match_method": match.method if match else "appended",
+            "match_confidence": match.confidence if match else 0.0
+        })
         print(f"✅ Embedded fixes for row {idx}")
 
     except Exception as e:
         fail_log.append({"index": idx, "reason": str(e)})
         print(f"❌ Error on row {idx}: {e}")
 
+# === Page-level mode: one document per page and strategy ===
+# Every row of a page whose node does not overlap another row's node is applied
+# to the same copy, wrapped in <section data-row="idx"> so Axe findings can be
+# attributed back to the row. Overlapping rows fall back to per-row files.
+def embed_page(page_no, html_path, rows):
+    rows_by_idx = dict(rows)
+    try:
+        page = load_page(html_path)
+        with page.lock:
+            if page.soup.body is None:
+                raise ValueError("Page has no <body> to append the fix to")
+            matches = {}
+            for idx, row in rows:
+                matches[idx] = approximate_match(page, row.get("html", ""), row.get("target"))
+            batch, deferred = partition_overlapping(
+                [(idx, match.node if match else None) for idx, match in matches.items()]
+            )
+            batch_rows = [(idx, rows_by_idx[idx], node) for idx, node in batch]
+
+            page_paths = {}
+            for fix_type in fix_types:
+                page_html = page.render_many([
+                    (node, str(BeautifulSoup(
+                        wrap_fixed_html(row.get(f"{fix_type}_response", ""), fix_type, row=idx), "html.parser"
+                    )))
+                    for idx, row, node in batch_rows
+                ])
+                page_paths[fix_type] = os.path.join(output_dir, f"page_{fix_type}_{page_no}.html")
+                with open(page_paths[fix_type], "w", encoding="utf-8") as f:
+                    f.write(page_html)
+
+    except Exception as e:
+        for idx, _ in rows:
+            fail_log.append({"index": idx, "reason": str(e)})
+        print(f"❌ Error on page {html_path}: {e}")
+        return
+
+    for idx, _, _ in batch_rows:
+        match = matches[idx]
+        success_log.append({
+            "index": idx, **{f"{fix_type}_path": path for fix_type, path in page_paths.items()},
+            "match_method": match.method if match else "appended",
+            "match_confidence": match.confidence if match else 0.0,
+            "page": page_no
+        })
+    print(f"✅ Embedded {len(batch_rows)} fix(es) into page {page_no} ({html_path})")
+
+    for idx, _ in deferred:
+        embed_row(idx, rows_by_idx[idx])
+
+# === Process ===
+pages = {}
+for idx, row in enumerate(data):
+    html_path = row.get("html_file_path", "")
+    if not html_path or not os.path.isfile(html_path):
+        fail_log.append({"index": idx, "reason": "Missing or invalid HTML file path"})
+        continue
+    if args.per_page:
+        pages.setdefault(html_path, []).append((idx, row))
+    else:
+        embed_row(idx, row)
+
+for page_no, (html_path, rows) in enumerate(pages.items()):
+    embed_page(page_no, html_path, rows)
+
 # === Save logs
 if fail_log:
     pd.DataFrame(fail_log).to_csv(os.path.join(output_dir, "embed_failures.csv"), index=False)
@@ -0,0 +1,205 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from bs4 import BeautifulSoup
+
+from snippet_similarity import shingles, FREE_TEXT_ATTRS
+
+# === Library of verified fixes, reused without an LLM call ===
+# When axecore_rerun.py sees a fix pass its rescan, the change it made to the
+# original snippet is stored as a template: per element (in document order)
+# the attributes it set or removed. Values are either literals (role, type,
+# enumerated aria-* states) or references to the snippet's own attributes and
+# text, so `aria-label` copied from a `title` is re-derived on the next page.
+# Fixes that add, drop or rename elements, or that need page-specific text the
+# snippet does not contain, are not stored.
+# Entries are keyed by rule ID, structural fingerprint and strategy; a fix that
+# later fails a rescan is disabled.
+
+# Values that differ per page: only reusable when copied from the snippet itself
+PAGE_SPECIFIC_ATTRS = FREE_TEXT_ATTRS | {
+    "alt", "title", "id", "for", "name", "href", "src", "value", "placeholder", "label", "headers"
+}
+
+
+def _value(value):
+    return " ".join(value) if isinstance(value, list) else value
+
+
+def _norm(text):
+    return " ".join(str(text).split())
+
+
+def _elements(html):
+    return BeautifulSoup(html or "", "html.parser").find_all(True)
+
+
+def _own_text(tag):
+    return _norm("".join(tag.find_all(string=True, recursive=False)))
+
+
+def fingerprint(html):
+    # Element sequence plus the structural shingles (free text excluded)
+    tags = [tag.name for tag in _elements(html)]
+    digest = hashlib.sha1()
+    digest.update(">".join(tags).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update("\n".join(sorted(shingles(html or ""))).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# === Templates: original snippet + verified fix -> attribute delta ===
+def _source_of(value, tags):
+    # Where an added value can be read from on the original snippet, if anywhere
+    wanted = _norm(value)
+    if not wanted:
+        return None
+    for position, tag in enumerate(tags):
+        for attr, current in tag.attrs.items():
+            if _norm(_value(current)) == wanted:
+                return ["attr", position, attr]
+    for position, tag in enumerate(tags):
+        if _norm(tag.get_text(" ", strip=True)) == wanted:
+            return ["text", position]
+    return None
+
+
+def derive_template(original_html, fixed_html):
+    original, fixed = _elements(original_html), _elements(fixed_html)
+    if not original or [t.name for t in original] != [t.name for t in fixed]:
+        return None
+    ops = []
+    for position, (before, after) in enumerate(zip(original, fixed)):
+        if _own_text(before) != _own_text(after):
+            return None
+        old = {k: _value(v) for k, v in before.attrs.items()}
+        new = {k: _value(v) for k, v in after.attrs.items()}
+        for attr in sorted(new):
+            if old.get(attr) == new[attr]:
+                continue
+            if attr not in PAGE_SPECIFIC_ATTRS:
+                source = ["literal", new[attr]]
+            else:
+                source = _source_of(new[attr], original)
+                if source is None:
+                    return None
+            ops.append({"tag": position, "set": attr, "from": source})
+        for attr in sorted(set(old) - set(new)):
+            ops.append({"tag": position, "remove": attr})
+    if not ops:
+        return None
+    return {"tags": [t.name for t in original], "ops": ops}
+
+
+def apply_template(template, html):
+    soup = BeautifulSoup(html or "", "html.parser")
+    tags = soup.find_all(True)
+    if [t.name for t in tags] != template["tags"]:
+        return None
+
+    # Resolve every value against the untouched snippet before changing anything
+    changes = []
+    for op in template["ops"]:
+        if "remove" in op:
+            changes.append((op["tag"], op["remove"], None))
+            continue
+        kind, *ref = op["from"]
+        if kind == "literal":
+            value = ref[0]
+        elif kind == "attr":
+            value = _value(tags[ref[0]].get(ref[1])) if ref[0] < len(tags) else None
+        else:
+            value = tags[ref[0]].get_text(" ", strip=True) if ref[0] < len(tags) else None
+        if not value or not _norm(value):
+            return None
+        changes.append((op["tag"], op["set"], _norm(value) if kind != "literal" else value))
+
+    for position, attr, value in changes:
+        if value is None:
+            tags[position].attrs.pop(attr, None)
+        else:
+            tags[position][attr] = value
+    return str(soup)
+
+
+def template_hash(template):
+    return hashlib.sha1(json.dumps(template, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class FixLibrary:
+    def __init__(self, db_path):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fixes (
+                rule_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                template_hash TEXT NOT NULL,
+                template TEXT NOT NULL,
+                example_html TEXT NOT NULL,
+                example_fix TEXT NOT NULL,
+                passes INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                updated REAL NOT NULL,
+                PRIMARY KEY (rule_id, fingerprint, strategy, template_hash)
+            );
+        """)
+
+    # Templated fix for this snippet, or None (then the model is asked)
+    def lookup(self, rule_id, html, strategy):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT template FROM fixes WHERE rule_id = ? AND fingerprint = ? AND strategy = ? "
+                "AND failures = 0 ORDER BY passes DESC, updated DESC",
+                (str(rule_id), fingerprint(html), strategy)
+            ).fetchall()
+        for (template,) in rows:
+            fixed = apply_template(json.loads(template), html)
+            if fixed is not None:
+                self.hits += 1
+                return fixed
+        self.misses += 1
+        return None
+
+    # Called with every rescanned fix; returns True when the fix is (or was) a template
+    def record(self, rule_id, original_html, fixed_html, strategy, passed):
+        template = derive_template(original_html, fixed_html)
+        if template is None:
+            return False
+        key = (str(rule_id), fingerprint(original_html), strategy, template_hash(template))
+        with self._lock:
+            if passed:
+                self.conn.execute("""
+                    INSERT INTO fixes (rule_id, fingerprint, strategy, template_hash, template,
+                                       example_html, example_fix, passes, failures, updated)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 1, 0, ?)
+                    ON CONFLICT (rule_id, fingerprint, strategy, template_hash)
+                    DO UPDATE SET passes = passes + 1, updated = excluded.updated
+                """, (*key, json.dumps(template), original_html, fixed_html, time.time()))
+            else:
+                self.conn.execute(
+                    "UPDATE fixes SET failures = failures + 1, updated = ? "
+                    "WHERE rule_id = ? AND fingerprint = ? AND strategy = ? AND template_hash = ?",
+                    (time.time(), *key)
+                )
+            self.conn.commit()
+        return True
+
+    def size(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM fixes WHERE failures = 0").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def summary(self, calls_per_hit=1):
+        # A hit serves every model run for that strategy, so it avoids one call per model
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"{self.hits:,} hits / {self.misses:,} misses ({rate:.1f}% hit rate), "
+                f"{self.hits * calls_per_hit:,} LLM calls avoided")
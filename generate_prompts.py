@@ -1,15 +1,37 @@
 import os
 import json
+import argparse
 import pandas as pd
+from functools import lru_cache
+
+from columnar_store import iter_batches, write_table, TableWriter
+from snippet_dedup import dedup_key, assign_groups, compression_summary
+from prompt_budget import count_tokens, trim_snippet
+from wcag_retrieval import WCAG_DOCS_DIR, DEFAULT_TOP_K
+from strategies import DEFAULT_STRATEGIES
 
 # === Input/Output Paths ===
-input_file = r"C:\Users\w23063958\OneDrive - Northumbria University - Production Azure AD\MSC PROJECT\EXPERIMENT\violations_urls_critical_sampled_20percent.csv"
-output_file = r"C:\Users\w23063958\OneDrive - Northumbria University - Production Azure AD\MSC PROJECT\EXPERIMENT\prompts_cot_rag.csv"
+experiment_dir = os.environ.get("PIPELINE_EXPERIMENT_DIR") or r"C:\Users\w23063958\OneDrive - Northumbria University - Production Azure AD\MSC PROJECT\EXPERIMENT"
+input_file = os.path.join(experiment_dir, "violations_urls_critical_sampled_20percent.csv")
+output_file = os.path.join(experiment_dir, "prompts_cot_rag.csv")
+# Rows sharing snippet + rule + failure summary (one LLM call per group in generate_fix.py)
+groups_file = os.path.join(os.path.dirname(output_file), "prompt_groups.csv")
+
+parser = argparse.ArgumentParser(description="Build CoT and RAG prompts for the sampled violations")
+parser.add_argument("--token-budget", type=int, default=None,
+                    help="max tokens per prompt; larger snippets are trimmed and token counts recorded")
+parser.add_argument("--retrieval", action="store_true",
+                    help="add top-k WCAG passages from the local BM25 index to the RAG prompt")
+parser.add_argument("--retrieval-top-k", type=int, default=DEFAULT_TOP_K)
+parser.add_argument("--strategies", nargs="+", default=DEFAULT_STRATEGIES,
+                    help="prompt strategies to build (keys of PROMPT_TEMPLATES)")
+parser.add_argument("--wcag-docs", default=WCAG_DOCS_DIR, help="folder of WCAG Understanding/Techniques documents")
+args = parser.parse_args()
 
-# === Load CSV ===
-df = pd.read_csv(input_file)
-df.fillna("", inplace=True)
-sampled_df = df.copy()  # No sampling applied
+retriever = None
+if args.retrieval:
+    from wcag_retrieval import load_index, Retriever
+    retriever = Retriever(load_index(args.wcag_docs), top_k=args.retrieval_top_k)
 
 # === Rule-specific fix hints
 FIX_HINTS = {
@@ -18,33 +40,30 @@ FIX_HINTS = {
     "aria-label": "Add a descriptive aria-label attribute to the element.",
     "aria-labelledby": "Reference an existing descriptive element using aria-labelledby.",
 }
+DEFAULT_HINT = "Refer to WCAG techniques and failure summary for fix guidance."
+DEFAULT_WCAG_URL = "https://www.w3.org/WAI/WCAG22/"
+DEFAULT_WCAG_GUIDELINE = "4.1.2"
+DEFAULT_WCAG_DESCRIPTION = "Name, Role, Value"
+
+# Rows are read, turned into prompts and appended to the output one batch at a time
+PROMPT_BATCH_SIZE = 50000
+MEMO_SIZE = 65536
+
+# === Per-value work, memoised: the same techniques JSON, node list or snippet recurs across rows ===
+@lru_cache(maxsize=MEMO_SIZE)
+def techniques_text(techniques_raw):
+    if not isinstance(techniques_raw, str):
+        return ""
+    try:
+        techniques = json.loads(techniques_raw)
+        return ", ".join([t["id"] for t in techniques])
+    except:
+        return techniques_raw
 
-# === Prompt Generation ===
-prompt_rows = []
-
-for _, row in sampled_df.iterrows():
-    html = row.get("html", "").strip()
-    rule_id = row.get("rule_id", "")
-    wcag_url = row.get("wcag_url") or "https://www.w3.org/WAI/WCAG22/"
-    wcag_guideline = row.get("wcag_guideline") or "4.1.2"
-    wcag_description = row.get("wcag_description") or "Name, Role, Value"
-    file = row.get("file", "")
-    html_file_path = row.get("html_file_path", "")
-    impact = row.get("impact", "")
-
-    # === Techniques
-    techniques_raw = row.get("wcag_techniques", "")
-    techniques_list = ""
-    if isinstance(techniques_raw, str):
-        try:
-            techniques = json.loads(techniques_raw)
-            techniques_list = ", ".join([t["id"] for t in techniques])
-        except:
-            techniques_list = techniques_raw
-
-    # === Failure Summary (max 5 lines)
+@lru_cache(maxsize=MEMO_SIZE)
+def failure_lines(nodes):
+    # (issue lines, parse error); lines found before an error are kept
     issue_list = []
-    nodes = row.get("nodes", "")
     try:
         nodes_data = json.loads(nodes)
         for node in nodes_data:
@@ -55,49 +74,202 @@ for _, row in sampled_df.iterrows():
                     if line and not line.lower().startswith("fix any of"):
                         issue_list.append(line)
     except Exception as e:
-        print(f" Failed to parse nodes for {file}: {e}")
+        return tuple(issue_list), str(e)
+    return tuple(issue_list), None
 
-    issue_list = list(set(issue_list))[:5]  # Deduplicate + limit to 5
-    issues_text = "\n- " + "\n- ".join(issue_list) if issue_list else "No specific failure details provided."
-    fix_hint = FIX_HINTS.get(rule_id, "Refer to WCAG techniques and failure summary for fix guidance.")
-    prompt_context = f"```html\n{html}\n```"
+@lru_cache(maxsize=MEMO_SIZE)
+def issues_text(issues):
+    issue_list = list(set(issues))[:5]  # Deduplicate + limit to 5
+    return "\n- " + "\n- ".join(issue_list) if issue_list else "No specific failure details provided."
 
+@lru_cache(maxsize=MEMO_SIZE)
+def group_key(html, rule_id, issues):
+    return dedup_key(html, rule_id, issues)
+
+# === Prompt templates: applied to whole columns, or to single values when re-fitting one row ===
+def code_block(html):
+    return "```html\n" + html + "\n```"
+
+def cot_template(p, prompt_context):
     # === Compact Chain-of-Thought Prompt
-    cot_prompt = (
-        f"HTML flagged under WCAG 2.2 SC {wcag_guideline} - {wcag_description} (rule ID: {rule_id}):\n"
-        f"Issues:{issues_text}\n\n"
-        f"Techniques: {techniques_list}\n"
-        f"Hint: {fix_hint}\n\n"
-        f"Fix this:\n{prompt_context}"
+    return (
+        "HTML flagged under WCAG 2.2 SC " + p["guideline"] + " - " + p["description"] + " (rule ID: " + p["rule"] + "):\n"
+        + "Issues:" + p["issues"] + "\n\n"
+        + "Techniques: " + p["techniques"] + "\n"
+        + "Hint: " + p["hint"] + "\n\n"
+        + "Fix this:\n" + prompt_context
     )
 
-    # === Compact Retrieval-Augmented Prompt
-    rag_prompt = (
-        f"This HTML violates WCAG 2.2 SC {wcag_guideline} - {wcag_description} (rule ID: {rule_id}).\n"
-        f"Issues:{issues_text}\n\n"
-        f"Refer to: {wcag_url} | Techniques: {techniques_list}\n"
-        f"Hint: {fix_hint}\n\n"
-        f"Return only fixed HTML:\n{prompt_context}"
+def rag_template(p, prompt_context):
+    # === Compact Retrieval-Augmented Prompt (retrieved passages, when enabled, follow the references)
+    refer = "Refer to: " + p["url"] + " | Techniques: " + p["techniques"] + "\n"
+    if "context" in p:
+        refer = refer + p["context"]
+    return (
+        "This HTML violates WCAG 2.2 SC " + p["guideline"] + " - " + p["description"] + " (rule ID: " + p["rule"] + ").\n"
+        + "Issues:" + p["issues"] + "\n\n"
+        + refer
+        + "Hint: " + p["hint"] + "\n\n"
+        + "Return only fixed HTML:\n" + prompt_context
     )
 
-    # === Store prompts
-    prompt_rows.append({
+# One entry per strategy; a new strategy is a template function plus its key here
+PROMPT_TEMPLATES = {"cot": cot_template, "rag": rag_template}
+strategies = args.strategies
+if any(s not in PROMPT_TEMPLATES for s in strategies):
+    parser.error(f"no prompt template for: {', '.join(s for s in strategies if s not in PROMPT_TEMPLATES)}")
+
+# === Optional token budget: re-fit over-budget prompts, each strategy on its own ===
+# Retrieved passages are dropped first (lowest ranked first), then the snippet is
+# trimmed structurally, never below its root start tag; a prompt that still does
+# not fit is sent as is and its row flagged over_budget. The html column keeps
+# the original snippet (it is what later stages match on); only the copy
+# embedded in the prompts is trimmed.
+def fit_prompt(strategy, row_parts, snippet, found, budget):
+    template = PROMPT_TEMPLATES[strategy]
+    prompt = template(row_parts, code_block(snippet))
+    tokens = count_tokens(prompt)
+    kept = None  # passages kept, when the retrieved context had to shrink
+    if found is not None and row_parts.get("context") and row_parts["context"] in prompt:
+        for limit in range(len(found) - 1, -1, -1):
+            if tokens <= budget:
+                break
+            kept = limit
+            row_parts = {**row_parts, "context": retriever.format_context(found[:limit])}
+            prompt = template(row_parts, code_block(snippet))
+            tokens = count_tokens(prompt)
+
+    trimmed = False
+    allowance = budget - (tokens - count_tokens(snippet))
+    for _ in range(3):
+        if tokens <= budget:
+            break
+        fitted, trimmed = trim_snippet(snippet, allowance)
+        prompt = template(row_parts, code_block(fitted))
+        tokens, previous = count_tokens(prompt), tokens
+        if tokens >= previous:
+            break
+        allowance -= tokens - budget
+    return prompt, tokens, trimmed, kept
+
+def apply_token_budget(prompts, parts, snippet, budget, found=None):
+    tokens = {s: prompts[f"{s}_prompt"].map(count_tokens) for s in strategies}
+    trimmed = pd.Series(False, index=prompts.index)
+    over_budget = pd.Series(False, index=prompts.index)
+
+    over = pd.concat(tokens.values(), axis=1).max(axis=1) > budget
+    for label in over[over].index:
+        row_parts = {k: v[label] for k, v in parts.items()}
+        for s in strategies:
+            if tokens[s][label] <= budget:
+                continue
+            prompt, count, snippet_trimmed, kept = fit_prompt(
+                s, row_parts, snippet[label], found[label] if found is not None else None, budget
+            )
+            prompts.at[label, f"{s}_prompt"] = prompt
+            tokens[s][label] = count
+            trimmed[label] = trimmed[label] or snippet_trimmed
+            over_budget[label] = over_budget[label] or count > budget
+            if kept is not None and "rag_passages" in prompts.columns:
+                prompts.at[label, "rag_passages"] = ", ".join(p["doc"] for p, _ in found[label][:kept])
+
+    for s in strategies:
+        prompts[f"{s}_tokens"] = tokens[s]
+    prompts["html_trimmed"] = trimmed
+    prompts["over_budget"] = over_budget
+    return prompts
+
+def column(batch, name, default=""):
+    if name in batch.columns:
+        return batch[name]
+    return pd.Series([default] * len(batch), index=batch.index, dtype=object)
+
+# === Column-wise prompt construction for one batch of violations ===
+def build_prompts(batch):
+    batch = batch.fillna("")
+
+    html = column(batch, "html").map(lambda v: v.strip())
+    rule_id = column(batch, "rule_id")
+    wcag_url = column(batch, "wcag_url", None).map(lambda v: v or DEFAULT_WCAG_URL)
+    wcag_guideline = column(batch, "wcag_guideline", None).map(lambda v: v or DEFAULT_WCAG_GUIDELINE)
+    wcag_description = column(batch, "wcag_description", None).map(lambda v: v or DEFAULT_WCAG_DESCRIPTION)
+    file = column(batch, "file")
+    techniques_list = column(batch, "wcag_techniques").map(techniques_text)
+    fix_hint = rule_id.map(lambda r: FIX_HINTS.get(r, DEFAULT_HINT))
+
+    failures = column(batch, "nodes").map(failure_lines)
+    for file_name, (_, error) in zip(file, failures):
+        if error is not None:
+            print(f" Failed to parse nodes for {file_name}: {error}")
+    issues = failures.map(lambda f: issues_text(f[0]))
+    keys = [group_key(h, r, f[0]) for h, r, f in zip(html, rule_id, failures)]
+
+    parts = {
+        "guideline": wcag_guideline.astype(str),
+        "description": wcag_description.astype(str),
+        "rule": rule_id.astype(str),
+        "issues": issues,
+        "techniques": techniques_list.astype(str),
+        "hint": fix_hint,
+        "url": wcag_url.astype(str)
+    }
+    if retriever is not None:
+        passages = [
+            retriever.passages(r, t, f[0]) for r, t, f in zip(rule_id, techniques_list, failures)
+        ]
+        parts["context"] = pd.Series(
+            [retriever.context(r, t, f[0]) for r, t, f in zip(rule_id, techniques_list, failures)],
+            index=batch.index
+        )
+    snippet = html.astype(str)
+
+    prompts = pd.DataFrame({
         "file": file,
         "rule_id": rule_id,
-        "html_file_path": html_file_path,
+        "html_file_path": column(batch, "html_file_path"),
         "html": html,
+        # Axe selector of the flagged node, used to locate it when fixes are embedded and rescanned
+        "target": column(batch, "target"),
         "wcag_guideline": wcag_guideline,
         "wcag_description": wcag_description,
         "wcag_url": wcag_url,
         "wcag_techniques": techniques_list,
-        "impact": impact,
-        "cot_prompt": cot_prompt,
-        "rag_prompt": rag_prompt
+        "impact": column(batch, "impact"),
+        **{f"{s}_prompt": PROMPT_TEMPLATES[s](parts, code_block(snippet)) for s in strategies}
     })
+    if retriever is not None:
+        prompts["rag_passages"] = [", ".join(p["doc"] for p, _ in found) for found in passages]
+    if args.token_budget:
+        found = pd.Series(passages, index=batch.index) if retriever is not None else None
+        prompts = apply_token_budget(prompts, parts, snippet, args.token_budget, found)
+    return prompts.reset_index(drop=True), keys
+
+# === Prompt Generation: stream batches from the sampled violations (Parquet store, CSV fallback) ===
+group_keys = []
+over_budget_rows = 0
+with TableWriter(output_file, quoting=1) as writer:
+    for batch in iter_batches(input_file, batch_size=PROMPT_BATCH_SIZE):
+        prompts, keys = build_prompts(batch)
+        writer.write(prompts)
+        group_keys.extend(keys)
+        if "over_budget" in prompts.columns:
+            over_budget_rows += int(prompts["over_budget"].sum())
+if writer.rows == 0:
+    write_table(pd.DataFrame(), output_file, quoting=1)
 
-# === Save CSV ===
-prompt_df = pd.DataFrame(prompt_rows)
-prompt_df.to_csv(output_file, index=False, quoting=1)
+# === Dedup groups (prompts file itself is unchanged) ===
+group_ids, representatives = assign_groups(group_keys)
+groups_df = pd.DataFrame({
+    "row": range(len(group_keys)),
+    "group_id": group_ids,
+    "representative": [representatives[g] for g in group_ids],
+    "group_key": group_keys
+})
+groups_df["group_size"] = groups_df.groupby("group_id")["row"].transform("size")
+groups_df.to_csv(groups_file, index=False)
 
 print("✅ Prompt generation complete.")
-print(f"📄 Saved to {output_file}")
+if over_budget_rows:
+    print(f"⚠️ {over_budget_rows:,} row(s) over the {args.token_budget}-token budget even at the smallest snippet (over_budget column)")
+print(f"🧩 Dedup: {compression_summary(len(group_keys), len(representatives))}")
+print(f"📄 Saved to {output_file} (groups in {groups_file})")
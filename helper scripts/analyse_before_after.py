@@ -1,5 +1,10 @@
+import os
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from strategies import arms_in, order_arms
+
 # === File Paths ===
 pre_file = "pre_fix_violation_summary.csv"
 grouped_file = "Grouped_Violations_with_HTML_Column.xlsx"
@@ -13,8 +18,12 @@ grouped_df = pd.read_excel(grouped_file)
 pre_df["file"] = pre_df["file"].astype(str).str.strip().str.lower()
 grouped_df["file"] = grouped_df["file"].astype(str).str.strip().str.lower()
 
+# === One column group per fix type (CoT, RAG, ... in configured order)
+fix_types = order_arms(list(dict.fromkeys(grouped_df["fix_type"].astype(str).str.lower())))
+response_columns = [f"{t}_response" for t in arms_in(grouped_df.columns, "_response")]
+
 # === Pivot grouped_df on 'fix_type' and 'file'
-pivoted = grouped_df.pivot(index="file", columns="fix_type", values=["violation_count", "cot_response", "rag_response", "html"])
+pivoted = grouped_df.pivot(index="file", columns="fix_type", values=["violation_count", *response_columns, "html"])
 pivoted.columns = ['_'.join(col).lower() for col in pivoted.columns]
 pivoted = pivoted.reset_index()
 
@@ -22,36 +31,26 @@ pivoted = pivoted.reset_index()
 merged = pd.merge(pre_df, pivoted, on="file", how="inner")
 
 # === Compute Compliance
-merged["cot_compliance_score"] = (merged["violation_count"] - merged["violation_count_cot"]) / merged["violation_count"]
-merged["rag_compliance_score"] = (merged["violation_count"] - merged["violation_count_rag"]) / merged["violation_count"]
-merged["cot_improved"] = merged["violation_count_cot"] < merged["violation_count"]
-merged["rag_improved"] = merged["violation_count_rag"] < merged["violation_count"]
+for t in fix_types:
+    merged[f"{t}_compliance_score"] = (merged["violation_count"] - merged[f"violation_count_{t}"]) / merged["violation_count"]
+for t in fix_types:
+    merged[f"{t}_improved"] = merged[f"violation_count_{t}"] < merged["violation_count"]
 
 # === Final Output
-evaluation_table = merged[[ 
-    "file",
-    "rule_id",
-    "html",                  # before fix
-    "html_cot",              # after CoT
-    "html_rag",              # after RAG
-    "cot_response_cot",
-    "rag_response_rag",
-    "violation_count",       # original
-    "violation_count_cot",
-    "violation_count_rag",
-    "cot_compliance_score",
-    "rag_compliance_score",
-    "cot_improved",
-    "rag_improved"
-]].rename(columns={
+evaluation_table = merged[
+    ["file", "rule_id", "html"]                                        # before fix
+    + [f"html_{t}" for t in fix_types]                                 # after each fix
+    + [f"{t}_response_{t}" for t in fix_types if f"{t}_response" in response_columns]
+    + ["violation_count"]                                              # original
+    + [f"violation_count_{t}" for t in fix_types]
+    + [f"{t}_compliance_score" for t in fix_types]
+    + [f"{t}_improved" for t in fix_types]
+].rename(columns={
     "html": "before_html",
     "violation_count": "original_violation_count",
-    "violation_count_cot": "cot_violation_count",
-    "violation_count_rag": "rag_violation_count",
-    "cot_response_cot": "cot_response",
-    "rag_response_rag": "rag_response",
-    "html_cot": "after_html_cot",
-    "html_rag": "after_html_rag"
+    **{f"violation_count_{t}": f"{t}_violation_count" for t in fix_types},
+    **{f"{t}_response_{t}": f"{t}_response" for t in fix_types},
+    **{f"html_{t}": f"after_html_{t}" for t in fix_types}
 })
 
 # === Add Manual Review Placeholders
@@ -1,132 +1,314 @@
 import os
+import sys
 import json
+import argparse
 import pandas as pd
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from axe_selenium_python import Axe
 from openpyxl import load_workbook
 from openpyxl.styles import Font
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from columnar_store import read_table, write_table
+from axe_pool import BrowserPool, DEFAULT_SESSIONS, scan_html, axe_build
+from scan_cache import ScanCache, scan_key, DEFAULT_MAX_BYTES
+from page_model import load_page, partition_overlapping, PAGE_PARSER
+from node_index import attribute_findings, UNRESOLVED
+from fix_library import FixLibrary
+from strategies import arms_in, parse_arm
+
 # === CONFIG ===
+parser = argparse.ArgumentParser(description="Rescan LLM fixes with axe-core on a pool of headless browsers")
+parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="number of parallel browser sessions (capped at CPU count)")
+parser.add_argument("--fix-types", nargs="+", default=None,
+                    help="strategies or arms to rescan (<arm>_response columns); default: every response column")
+parser.add_argument("--output-dir", default="axe_wrapped_html_reports_merged", help="reports, per-fix Axe JSON and the scan cache")
+parser.add_argument("--scan-cache-db", default=None,
+                    help="scan cache file, shared by runs over different strategies (default: in --output-dir)")
+parser.add_argument("--write-temp-html", action="store_true", help="also write each scanned page to html_temp_for_scan/ (debugging)")
+parser.add_argument("--no-scan-cache", action="store_true", help="rescan every page even if an identical one was scanned before")
+parser.add_argument("--per-page", action="store_true", help="apply every non-overlapping fix of a page to one document and scan it once")
+parser.add_argument("--fix-library", default="verified_fix_library.sqlite", help="verified fix templates reused by generate_fix.py")
+parser.add_argument("--no-fix-library", action="store_true", help="do not record passing fixes as templates")
+parser.add_argument("--scan-cache-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="size limit of the scan cache (LRU eviction)")
+args = parser.parse_args()
+
 FIX_DATA_XLSX = "results_cot_rag_generated.xlsx"
-OUTPUT_DIR = "axe_wrapped_html_reports_merged"
+OUTPUT_DIR = args.output_dir
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 AXE_JSON_DIR = os.path.join(OUTPUT_DIR, "axe_json")
 os.makedirs(AXE_JSON_DIR, exist_ok=True)
 
 HTML_TEMP_DIR = os.path.join(OUTPUT_DIR, "html_temp_for_scan")
-os.makedirs(HTML_TEMP_DIR, exist_ok=True)
+if args.write_temp_html:
+    os.makedirs(HTML_TEMP_DIR, exist_ok=True)
 
-# === Load Fix Data ===
-df_fixes = pd.read_excel(FIX_DATA_XLSX)
+SCAN_CACHE_DB = args.scan_cache_db or os.path.join(OUTPUT_DIR, "axe_scan_cache.sqlite")
+SCAN_OPTIONS = None  # axe.run options; part of the cache key
+scan_cache = None if args.no_scan_cache else ScanCache(SCAN_CACHE_DB, max_bytes=args.scan_cache_mb * 1024 * 1024)
+fix_library = None if args.no_fix_library else FixLibrary(args.fix_library)
+templated = 0
 
-# === Headless Chrome Setup ===
-options = webdriver.ChromeOptions()
-options.add_argument("--headless")
-driver = webdriver.Chrome(options=options)
+# === Load Fix Data ===
+df_fixes = read_table(FIX_DATA_XLSX)
+# One arm per <arm>_response column: a strategy, or strategy__model when several models were run
+ALL_ARMS = arms_in(df_fixes.columns, "_response")
+FIX_TYPES = [
+    arm for arm in ALL_ARMS
+    if args.fix_types is None or arm in args.fix_types or parse_arm(arm)[0] in args.fix_types
+]
+if not FIX_TYPES:
+    parser.error(f"no response columns for {args.fix_types} in {FIX_DATA_XLSX} (found: {', '.join(ALL_ARMS)})")
 
 results = []
+row_jobs = []  # (idx, fix_type, row) in output order
+scan_jobs = []  # ("row", (idx, fix_type, row)) or ("page", (page_no, fix_type, [(idx, row, match)]))
+
+
+def wrap_fix(html_fix, idx=None):
+    # No strategy marker inside the scanned <main> (it is in the <title>), so the
+    # same fix from different strategies is one scan-cache entry
+    attrs = {}
+    if idx is not None:
+        attrs["data-row"] = str(idx)
+    wrapped_section = BeautifulSoup("", "html.parser").new_tag("section", **attrs)
+    wrapped_section.append(BeautifulSoup(html_fix, "html.parser"))
+    return str(wrapped_section)
+
+
+def wrap_document(title, page_html):
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="UTF-8"><title>{title}</title></head>
+<body><main id="axe-scan-target">{page_html}</main></body>
+</html>"""
+
+
+def locate_fix(page, row):
+    # Indexed lookup; a same-tag guess is still used but reported with low confidence
+    return page.index.locate(row.get("html", ""), row.get("target"), fallback=True)
+
+
+def match_info_of(match):
+    return {
+        "match_method": match.method if match else "appended",
+        "match_confidence": match.confidence if match else 0.0
+    }
+
+
+def build_wrapped_page(idx, fix_type, row):
+    html_path = row.get("html_file_path", "")
+    html_fix = row.get(f"{fix_type}_response", "")
+
+    # Each source page is parsed once and shared by its rows and fix types
+    page = load_page(html_path)
+
+    with page.lock:
+        match = locate_fix(page, row)
+        match_tag = match.node if match else None
+
+        if not match_tag and page.soup.body is None:
+            raise ValueError("Page has no <body> to append the fix to")
+        page_html = page.render(match_tag, wrap_fix(html_fix))
+
+    return wrap_document(f"Fix {idx} {fix_type.upper()}", page_html), match
+
+
+# === Scan one wrapped document in memory (or answer it from the scan cache) ===
+def scan_document(driver, full_html, name, owner_attr=None):
+    # Pages are scanned in memory; the file copy is only kept for debugging
+    if args.write_temp_html:
+        html_file_path = os.path.join(HTML_TEMP_DIR, f"{name}.html")
+        with open(html_file_path, "w", encoding="utf-8") as f:
+            f.write(full_html)
+
+    # Identical documents (modulo whitespace) are answered from the scan cache
+    if scan_cache is not None:
+        # Results tagged with owners are not interchangeable with untagged ones
+        key = scan_key(full_html, axe_build(), {"options": SCAN_OPTIONS, "owner_attr": owner_attr} if owner_attr else SCAN_OPTIONS)
+        cached = scan_cache.get(key)
+        if cached is not None:
+            return cached
+
+    axe_result = scan_html(driver, full_html, options=SCAN_OPTIONS, owner_attr=owner_attr)
+    if scan_cache is not None:
+        scan_cache.put(key, axe_result)
+    return axe_result
+
+
+# === Runs on a pool session: one row's fix, or every batched fix of a page ===
+def rescan_fix(driver, job):
+    kind, payload = job
+    if kind == "row":
+        idx, fix_type, row = payload
+        full_html, match = build_wrapped_page(idx, fix_type, row)
+        return scan_document(driver, full_html, f"fix_{idx}_{fix_type}"), match_info_of(match)
+
+    page_no, fix_type, batch = payload
+    page = load_page(batch[0][1].get("html_file_path", ""))
+    with page.lock:
+        if page.soup.body is None:
+            raise ValueError("Page has no <body> to append the fix to")
+        page_html = page.render_many([
+            (match.node if match else None, wrap_fix(row.get(f"{fix_type}_response", ""), idx))
+            for idx, row, match in batch
+        ])
+    full_html = wrap_document(f"Page {page_no} {fix_type.upper()}", page_html)
+    axe_result = scan_document(driver, full_html, f"page_{page_no}_{fix_type}", owner_attr="data-row")
+
+    # Findings are attributed to rows in the browser (data-row of the closest section),
+    # falling back to their target selectors on the scanned document
+    owners = attribute_findings(BeautifulSoup(full_html, PAGE_PARSER), axe_result)
+    return axe_result, owners
+
 
 for idx, row in df_fixes.iterrows():
     html_path = row.get("html_file_path", "")
-    file_name = row.get("file", "")  # <--- added
     if not os.path.isfile(html_path):
         continue
 
-    for fix_type in ["cot", "rag"]:
+    for fix_type in FIX_TYPES:
         html_fix = row.get(f"{fix_type}_response", "")
         if not html_fix or "<" not in html_fix:
             continue
+        row_jobs.append((idx, fix_type, row))
 
-        try:
-            with open(html_path, "r", encoding="utf-8") as f:
-                original_html = f.read()
-
-            soup = BeautifulSoup(original_html, "html.parser")
-            old_fragment = row.get("html", "")
-            original_tag = BeautifulSoup(old_fragment, "html.parser").find()
-            match_tag = None
-
-            if original_tag:
-                candidates = soup.find_all(original_tag.name)
-                for tag in candidates:
-                    if tag.get("id") == original_tag.get("id"):
-                        match_tag = tag
-                        break
-                if not match_tag and candidates:
-                    match_tag = candidates[0]
-
-            if match_tag:
-                wrapped_section = soup.new_tag("section", **{"data-source": fix_type})
-                wrapped_section.append(BeautifulSoup(html_fix, "html.parser"))
-                match_tag.replace_with(wrapped_section)
-            else:
-                fallback = soup.new_tag("section", **{"data-source": fix_type})
-                fallback.append(BeautifulSoup(html_fix, "html.parser"))
-                soup.body.append(fallback)
-
-            full_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head><meta charset="UTF-8"><title>Fix {idx} {fix_type.upper()}</title></head>
-<body><main id="axe-scan-target">{str(soup)}</main></body>
-</html>"""
+if not args.per_page:
+    scan_jobs = [("row", job) for job in row_jobs]
+else:
+    # Group by source page and strategy; overlapping fixes are scanned on their own
+    groups = {}
+    for idx, fix_type, row in row_jobs:
+        groups.setdefault((row.get("html_file_path", ""), fix_type), []).append((idx, row))
 
-            html_file_path = os.path.join(HTML_TEMP_DIR, f"fix_{idx}_{fix_type}.html")
-            with open(html_file_path, "w", encoding="utf-8") as f:
-                f.write(full_html)
+    page_numbers = {}
+    for (html_path, fix_type), rows in groups.items():
+        page_no = page_numbers.setdefault(html_path, len(page_numbers))
+        page = load_page(html_path)
+        with page.lock:
+            matches = {idx: locate_fix(page, row) for idx, row in rows}
+        batch, deferred = partition_overlapping(
+            [(idx, match.node if match else None) for idx, match in matches.items()]
+        )
+        rows_by_idx = dict(rows)
+        scan_jobs.append(("page", (page_no, fix_type, [(idx, rows_by_idx[idx], matches[idx]) for idx, _ in batch])))
+        scan_jobs.extend(("row", (idx, fix_type, rows_by_idx[idx])) for idx, _ in deferred)
 
-            driver.get("file://" + os.path.abspath(html_file_path))
-            axe = Axe(driver)
-            axe.inject()
-            axe_result = axe.run("main#axe-scan-target")
+# === Scan on the browser pool; results come back in job order ===
+pool = BrowserPool(sessions=args.sessions)
+print(f"🧪 Scanning {len(scan_jobs)} documents for {len(row_jobs)} fixes on {pool.sessions} browser session(s)...")
+axe_results = pool.map(rescan_fix, scan_jobs)
 
-            violations = axe_result.get("violations", [])
-            incomplete = axe_result.get("incomplete", [])
-            is_pass = not violations and not incomplete
+# Per-row outcome: (axe_result or exception, match_info, extra columns)
+outcomes = {}
+for (kind, payload), scanned in zip(scan_jobs, axe_results):
+    if kind == "row":
+        idx, fix_type, _ = payload
+        if isinstance(scanned, Exception):
+            outcomes[(idx, fix_type)] = (scanned, None, None, {})
+        else:
+            axe_result, match_info = scanned
+            axe_json_path = os.path.join(AXE_JSON_DIR, f"{idx}_{fix_type}_axe.json")
+            outcomes[(idx, fix_type)] = (axe_result, axe_json_path, match_info, {})
+        continue
 
-            violation_descriptions = "; ".join([v.get("description", "") for v in violations])
+    page_no, fix_type, batch = payload
+    if isinstance(scanned, Exception):
+        for idx, _, _ in batch:
+            outcomes[(idx, fix_type)] = (scanned, None, None, {})
+        continue
 
-            axe_json_path = os.path.join(AXE_JSON_DIR, f"{idx}_{fix_type}_axe.json")
+    # One JSON per page document; each row keeps only the findings inside its section
+    axe_result, owners = scanned
+    axe_json_path = os.path.join(AXE_JSON_DIR, f"page_{page_no}_{fix_type}_axe.json")
+    with open(axe_json_path, "w", encoding="utf-8") as f:
+        json.dump(axe_result, f, indent=2, ensure_ascii=False)
+    outside = owners.get(None, {})
+    unresolved = owners.get(UNRESOLVED, {})
+    for idx, _, match in batch:
+        own = owners.get(str(idx), {})
+        row_result = {"violations": own.get("violations", []), "incomplete": own.get("incomplete", [])}
+        outcomes[(idx, fix_type)] = (row_result, None, match_info_of(match), {
+            "page": page_no,
+            "page_axe_json_path": axe_json_path,
+            "page_unattributed_violations": len(outside.get("violations", [])),
+            "page_unattributed_incomplete": len(outside.get("incomplete", [])),
+            "page_unresolved_findings": len(unresolved.get("violations", [])) + len(unresolved.get("incomplete", []))
+        })
+
+for idx, fix_type, row in row_jobs:
+    file_name = row.get("file", "")  # <--- added
+
+    try:
+        axe_result, axe_json_path, match_info, page_info = outcomes[(idx, fix_type)]
+        if isinstance(axe_result, Exception):
+            raise axe_result
+
+        violations = axe_result.get("violations", [])
+        incomplete = axe_result.get("incomplete", [])
+        # A finding that could not be traced to a section may be this row's: never a pass
+        unknown = not violations and not incomplete and page_info.get("page_unresolved_findings", 0) > 0
+        is_pass = not violations and not incomplete and not unknown
+
+        violation_descriptions = "; ".join([v.get("description", "") for v in violations])
+
+        if axe_json_path is not None:
             with open(axe_json_path, "w", encoding="utf-8") as f:
                 json.dump(axe_result, f, indent=2, ensure_ascii=False)
+        else:
+            axe_json_path = page_info["page_axe_json_path"]
+
+        evaluation = "✅ Pass" if is_pass else ("⚠️ New Violation" if violations else "❌ Still Failing")
+        if unknown:
+            evaluation = "❓ Unattributed Findings"
+
+        # Passing fixes become templates; a failing one disables the template it came from
+        if fix_library is not None and not unknown:
+            templated += fix_library.record(row.get("rule_id", ""), str(row.get("html", "") or ""),
+                                            str(row.get(f"{fix_type}_response", "") or ""),
+                                            parse_arm(fix_type)[0], is_pass)
+
+        results.append({
+            "index": idx,
+            "file": file_name,  # <--- added
+            "fix_type": fix_type.upper(),
+            "rule_id": row.get("rule_id", ""),
+            "evaluation": evaluation,
+            "violation_count": len(violations),
+            "incomplete_count": len(incomplete),
+            "violation_descriptions": violation_descriptions,
+            **{f"{arm}_response": row.get(f"{arm}_response", "") for arm in ALL_ARMS},
+            "axe_json_path": axe_json_path,
+            **match_info,
+            **{k: v for k, v in page_info.items() if k != "page_axe_json_path"}
+        })
+
+    except Exception as e:
+        results.append({
+            "index": idx,
+            "file": file_name,  # <--- added
+            "fix_type": fix_type.upper(),
+            "rule_id": row.get("rule_id", ""),
+            "evaluation": f"❌ Error: {e}",
+            "violation_count": "N/A",
+            "incomplete_count": "N/A",
+            "violation_descriptions": str(e),
+            **{f"{arm}_response": row.get(f"{arm}_response", "") for arm in ALL_ARMS},
+            "axe_json_path": "N/A"
+        })
 
-            evaluation = "✅ Pass" if is_pass else ("⚠️ New Violation" if violations else "❌ Still Failing")
-
-            results.append({
-                "index": idx,
-                "file": file_name,  # <--- added
-                "fix_type": fix_type.upper(),
-                "rule_id": row.get("rule_id", ""),
-                "evaluation": evaluation,
-                "violation_count": len(violations),
-                "incomplete_count": len(incomplete),
-                "violation_descriptions": violation_descriptions,
-                "cot_response": row.get("cot_response", ""),
-                "rag_response": row.get("rag_response", ""),
-                "axe_json_path": axe_json_path
-            })
-
-        except Exception as e:
-            results.append({
-                "index": idx,
-                "file": file_name,  # <--- added
-                "fix_type": fix_type.upper(),
-                "rule_id": row.get("rule_id", ""),
-                "evaluation": f"❌ Error: {e}",
-                "violation_count": "N/A",
-                "incomplete_count": "N/A",
-                "violation_descriptions": str(e),
-                "cot_response": row.get("cot_response", ""),
-                "rag_response": row.get("rag_response", ""),
-                "axe_json_path": "N/A"
-            })
-
-driver.quit()
+if pool.restarts:
+    print(f"♻️ Restarted crashed browser sessions {pool.restarts} time(s)")
+if scan_cache is not None:
+    print(f"🗃️ Scan cache: {scan_cache.summary()}")
+    scan_cache.close()
+if fix_library is not None:
+    print(f"🧰 Fix library: {templated} rescanned fixes expressible as templates, {fix_library.size():,} verified templates in {args.fix_library}")
+    fix_library.close()
 
 # === Save Outputs ===
 summary_df = pd.DataFrame(results)
-summary_df.to_csv(os.path.join(OUTPUT_DIR, "axe_evaluation_summary.csv"), index=False)
+write_table(summary_df, os.path.join(OUTPUT_DIR, "axe_evaluation_summary.csv"))
 
 xlsx_path = os.path.join(OUTPUT_DIR, "axe_evaluation_summary.xlsx")
 summary_df.to_excel(xlsx_path, index=False)
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import json
+import statistics
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wcag_retrieval import WCAG_DOCS_DIR, BM25Index, Retriever, load_index
+
+# === Index build and query latency of the WCAG retrieval index ===
+# Queries come from prompts_cot_rag.csv (rule_id, wcag_techniques and the
+# "Issues" lines of the prompt) when present, otherwise from a few rule ids.
+
+prompts_file = "prompts_cot_rag.csv"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+start = time.perf_counter()
+index = BM25Index.build(WCAG_DOCS_DIR)
+build_ms = (time.perf_counter() - start) * 1000
+
+load_index(WCAG_DOCS_DIR, rebuild=True)
+start = time.perf_counter()
+load_index(WCAG_DOCS_DIR)
+load_ms = (time.perf_counter() - start) * 1000
+
+queries = []
+if os.path.exists(prompts_file):
+    df = pd.read_csv(prompts_file, usecols=["rule_id", "wcag_techniques", "rag_prompt"]).fillna("")
+    for rule_id, techniques, prompt in df.itertuples(index=False):
+        issues = prompt.split("Issues:", 1)[-1].split("\n\n", 1)[0]
+        queries.append((rule_id, techniques, tuple(line.strip("- ") for line in issues.splitlines() if line.strip())))
+else:
+    for rule_id, techniques in [("button-name", "G108, ARIA14"), ("aria-required-parent", "ARIA12, ARIA17"),
+                                ("label", "H44, ARIA16"), ("aria-valid-attr-value", "ARIA5")]:
+        queries.append((rule_id, techniques, ("Element does not have an accessible name",)))
+
+retriever = Retriever(index)
+cold = []  # BM25 search without the memo
+for rule_id, techniques, issues in queries:
+    start = time.perf_counter()
+    retriever._lookup(rule_id, techniques, tuple(sorted(set(issues))))
+    cold.append((time.perf_counter() - start) * 1000)
+
+for rule_id, techniques, issues in queries:
+    retriever.passages(rule_id, techniques, issues)
+warm = []
+for rule_id, techniques, issues in queries:
+    start = time.perf_counter()
+    retriever.passages(rule_id, techniques, issues)
+    warm.append((time.perf_counter() - start) * 1000)
+
+report = {
+    "documents": len({p["doc"] for p in index.passages}),
+    "passages": len(index.passages),
+    "terms": len(index.postings),
+    "build_ms": round(build_ms, 2),
+    "load_ms": round(load_ms, 2),
+    "queries": len(queries),
+    "unique_queries": retriever.lookup.cache_info().currsize,
+    "query_ms_p50": round(statistics.median(cold), 3),
+    "query_ms_p95": round(percentile(cold, 0.95), 3),
+    "memoised_ms_p50": round(statistics.median(warm), 4)
+}
+print(json.dumps(report, indent=2))
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from columnar_store import read_table
+from snippet_similarity import (
+    shingles, hashed_vectors, kmeans, minhash_signatures, lsh_clusters,
+    NUM_PERM, LSH_BANDS, SIMILARITY_THRESHOLD
+)
+
+# === Cluster critical violations by snippet structure ===
+# Writes clustered_violations.json (read by map_direct_to_wcag_rules.py and
+# violation_count.py): every violation row plus impact_score, kmeans_cluster
+# and dbscan_cluster (-1 = no structurally similar snippet, as with DBSCAN noise).
+# Identical snippets are vectorised once and weighted by their count.
+
+parser = argparse.ArgumentParser(description="Cluster violation snippets (hashed shingles, k-means + MinHash-LSH)")
+parser.add_argument("--input", default="violations_urls_critical.csv")
+parser.add_argument("--output", default="clustered_violations.json")
+parser.add_argument("--k", type=int, default=20, help="number of k-means clusters")
+parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD, help="Jaccard similarity for the density clusters")
+parser.add_argument("--num-perm", type=int, default=NUM_PERM)
+parser.add_argument("--bands", type=int, default=LSH_BANDS)
+parser.add_argument("--seed", type=int, default=42)
+args = parser.parse_args()
+
+IMPACT_SCORES = {"minor": 1, "moderate": 2, "serious": 3, "critical": 4}
+
+# === Load violations ===
+df = read_table(args.input)
+df.fillna("", inplace=True)
+start = time.perf_counter()
+
+# === Vectorise unique snippets ===
+snippets = df["html"].astype(str)
+unique_snippets, inverse, counts = np.unique(snippets.to_numpy(), return_inverse=True, return_counts=True)
+feature_sets = [shingles(html) for html in unique_snippets]
+
+matrix = hashed_vectors(feature_sets)
+kmeans_labels = kmeans(matrix, args.k, seed=args.seed, weights=counts)
+
+signatures = minhash_signatures(feature_sets, num_perm=args.num_perm, seed=args.seed)
+dbscan_labels = lsh_clusters(signatures, bands=args.bands, threshold=args.threshold, weights=counts)
+
+df["impact_score"] = df["impact"].map(lambda v: IMPACT_SCORES.get(str(v).lower(), 0)) if "impact" in df.columns else 0
+df["kmeans_cluster"] = kmeans_labels[inverse]
+df["dbscan_cluster"] = dbscan_labels[inverse]
+elapsed = time.perf_counter() - start
+
+# === Save JSON (nodes/target back to lists) ===
+def parse_json(value):
+    if isinstance(value, str) and value[:1] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+records = df.to_dict(orient="records")
+for record in records:
+    for key in ("nodes", "target", "wcag_techniques"):
+        if key in record:
+            record[key] = parse_json(record[key])
+    record["kmeans_cluster"] = int(record["kmeans_cluster"])
+    record["dbscan_cluster"] = int(record["dbscan_cluster"])
+
+with open(args.output, "w", encoding="utf-8") as f:
+    json.dump(records, f, indent=2, ensure_ascii=False, default=str)
+
+noise = int((df["dbscan_cluster"] == -1).sum())
+density_clusters = int(df["dbscan_cluster"].max()) + 1 if len(df) else 0
+print(f"🧩 {len(df):,} violations, {len(unique_snippets):,} unique snippets clustered in {elapsed:.1f}s")
+print(f"   k-means: {df['kmeans_cluster'].nunique()} clusters | "
+      f"LSH density: {density_clusters} clusters, {noise:,} unclustered (-1)")
+print(f"✅ Saved to {args.output}")
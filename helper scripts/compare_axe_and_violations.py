@@ -1,13 +1,17 @@
 import json
 import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from strategies import DEFAULT_STRATEGIES
 
 # Input files
 clustered_json_path = "clustered_violations_mapped.json"
 scan_results_dir = "axe_scan_reports"
 output_csv_path = "violation_fix_comparison_dual.csv"
 
-# Collect failing rules from each Axe scan (RAG and CoT)
+# Collect failing rules from each Axe scan (one per strategy)
 def extract_failing_rules(filepath):
     with open(filepath, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -20,8 +24,8 @@ def extract_failing_rules(filepath):
 
 # Load all scan result files
 scan_files = {
-    "cot": os.path.join(scan_results_dir, "axe_result_cot_0.json"),  # adjust index if needed
-    "rag": os.path.join(scan_results_dir, "axe_result_rag_0.json")   # adjust index if needed
+    fix_type: os.path.join(scan_results_dir, f"axe_result_{fix_type}_0.json")  # adjust index if needed
+    for fix_type in DEFAULT_STRATEGIES
 }
 
 # Build lookup per fix type
@@ -42,7 +46,7 @@ results = []
 for entry in clustered_violations:
     rule_id = entry.get("rule_id", "").lower()
 
-    for fix_type in ["cot", "rag"]:
+    for fix_type in scan_files:
         result_entry = entry.copy()
         result_entry["source_file"] = fix_type
         result_entry["fix_status"] = "Not Fixed" if rule_id in failing_rules_by_type[fix_type] else "✅ Fixed"
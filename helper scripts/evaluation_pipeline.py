@@ -1,79 +1,92 @@
 import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy.stats import ttest_rel, shapiro, wilcoxon, f_oneway
+from scipy.stats import shapiro, f_oneway
 
-# === Load Evaluation Data ===
-df = pd.read_csv("Fix_Evaluation_Table.csv")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from charts import box_chart, bar_chart, rule_and_sc_facets, render_charts, summary
+from comparison import compare
+from strategies import arms_in, order_arms, label, to_long
 
-# === Clean and Prepare ===
-df = df.dropna(subset=["cot_compliance_score", "rag_compliance_score", "original_violation_count"])
-df["cot_compliance_score"] = pd.to_numeric(df["cot_compliance_score"], errors="coerce")
-df["rag_compliance_score"] = pd.to_numeric(df["rag_compliance_score"], errors="coerce")
 
-# === Compute Fix Success Rate ===
-cot_success_rate = (df["cot_compliance_score"] > 0).mean() * 100
-rag_success_rate = (df["rag_compliance_score"] > 0).mean() * 100
+def ci_text(ci, scale=1):
+    low, high = ci
+    return f"[{low * scale:.2f}, {high * scale:.2f}]"
 
-# === Compute New Violation Rate ===
-df["cot_new_violation"] = df["cot_violation_count"] > df["original_violation_count"]
-df["rag_new_violation"] = df["rag_violation_count"] > df["original_violation_count"]
-cot_new_violation_rate = df["cot_new_violation"].mean() * 100
-rag_new_violation_rate = df["rag_new_violation"].mean() * 100
 
-# === Statistical Analysis ===
-shapiro_cot = shapiro(df["cot_compliance_score"])
-shapiro_rag = shapiro(df["rag_compliance_score"])
-t_stat, t_p = ttest_rel(df["cot_compliance_score"], df["rag_compliance_score"])
-wilcoxon_stat, wilcoxon_p = wilcoxon(df["cot_compliance_score"], df["rag_compliance_score"])
-anova_stat, anova_p = f_oneway(df["original_violation_count"],
-                               df["cot_violation_count"],
-                               df["rag_violation_count"])
+# Worker processes re-import this script when charts are rendered, so it only runs as __main__
+if __name__ == "__main__":
+    # === Load Evaluation Data ===
+    df = pd.read_csv("Fix_Evaluation_Table.csv")
 
-# === Cohen’s d ===
-diff = df["rag_compliance_score"] - df["cot_compliance_score"]
-cohens_d = diff.mean() / diff.std()
+    # === Strategies in the table (cot, rag, ...), from their <strategy>_compliance_score columns ===
+    strategies = order_arms(arms_in(df.columns, "_compliance_score"))
+    labels = [label(s) for s in strategies]
+    score_columns = [f"{s}_compliance_score" for s in strategies]
 
-# === Print Summary ===
-print("=== Evaluation Summary ===")
-print(f"CoT Fix Success Rate: {cot_success_rate:.2f}%")
-print(f"RAG Fix Success Rate: {rag_success_rate:.2f}%")
-print(f"CoT New Violation Rate: {cot_new_violation_rate:.2f}%")
-print(f"RAG New Violation Rate: {rag_new_violation_rate:.2f}%")
-print(f"Shapiro-Wilk (CoT) p = {shapiro_cot.pvalue:.4f}")
-print(f"Shapiro-Wilk (RAG) p = {shapiro_rag.pvalue:.4f}")
-print(f"T-Test p = {t_p:.4f}")
-print(f"Wilcoxon p = {wilcoxon_p:.4f}")
-print(f"ANOVA p = {anova_p:.4f}")
-print(f"Cohen’s d = {cohens_d:.2f}")
+    # === Clean and Prepare ===
+    df = df.dropna(subset=score_columns + ["original_violation_count"])
+    for column in score_columns:
+        df[column] = pd.to_numeric(df[column], errors="coerce")
 
-# === Visualizations ===
-output_dir = "eval_charts"
-os.makedirs(output_dir, exist_ok=True)
+    # === Compute Fix Success Rate ===
+    success_rate = {s: (df[f"{s}_compliance_score"] > 0).mean() * 100 for s in strategies}
 
-# Boxplot of Compliance Scores
-plt.figure(figsize=(10, 6))
-sns.boxplot(data=df[["cot_compliance_score", "rag_compliance_score"]])
-plt.title("Boxplot of Compliance Scores")
-plt.ylabel("Compliance Score")
-plt.savefig(os.path.join(output_dir, "boxplot_compliance_scores.png"))
-plt.close()
+    # === Compute New Violation Rate ===
+    for s in strategies:
+        df[f"{s}_new_violation"] = df[f"{s}_violation_count"] > df["original_violation_count"]
+    new_violation_rate = {s: df[f"{s}_new_violation"].mean() * 100 for s in strategies}
 
-# Fix Success Rate Barplot
-plt.figure(figsize=(8, 6))
-sns.barplot(x=["CoT", "RAG"], y=[cot_success_rate, rag_success_rate])
-plt.title("Fix Success Rate")
-plt.ylabel("Success Rate (%)")
-plt.savefig(os.path.join(output_dir, "barplot_fix_success_rate.png"))
-plt.close()
+    # === Statistical Analysis ===
+    shapiro_p = {s: shapiro(df[f"{s}_compliance_score"]).pvalue for s in strategies}
+    anova_stat, anova_p = f_oneway(df["original_violation_count"], *(df[f"{s}_violation_count"] for s in strategies))
 
-# New Violation Rate Barplot
-plt.figure(figsize=(8, 6))
-sns.barplot(x=["CoT", "RAG"], y=[cot_new_violation_rate, rag_new_violation_rate])
-plt.title("New Violation Rate")
-plt.ylabel("New Violation Rate (%)")
-plt.savefig(os.path.join(output_dir, "barplot_new_violation_rate.png"))
-plt.close()
+    # === Bootstrap CIs, Cohen's d and paired tests for every pair of strategies ===
+    long_df = to_long(df.reset_index(drop=True), strategies, ["compliance_score"])
+    long_df["fixed"] = long_df["compliance_score"] > 0
+    compared = compare(long_df, "compliance_score", success="fixed", labels=dict(zip(strategies, labels)))
 
-print(f"\nCharts saved in: {output_dir}")
+    # === Print Summary ===
+    print("=== Evaluation Summary ===")
+    for s, name in zip(strategies, labels):
+        print(f"{name} Fix Success Rate: {success_rate[s]:.2f}% 95% CI {ci_text(compared['arms'][s]['success_rate_ci'], 100)}")
+    for s, name in zip(strategies, labels):
+        print(f"{name} New Violation Rate: {new_violation_rate[s]:.2f}%")
+    for s, name in zip(strategies, labels):
+        print(f"Shapiro-Wilk ({name}) p = {shapiro_p[s]:.4f}")
+    if "friedman_p" in compared["omnibus"]:
+        print(f"Friedman p = {compared['omnibus']['friedman_p']:.4f}")
+    for pair in compared["pairwise"]:
+        # Effect of the later strategy over the earlier one (RAG - CoT)
+        a, b = labels[strategies.index(pair["a"])], labels[strategies.index(pair["b"])]
+        low, high = pair["cohens_d_ci"]
+        prefix = f"{b} vs {a}: " if len(strategies) > 2 else ""
+        print(f"{prefix}T-Test p = {pair['ttest_p']:.4f}")
+        print(f"{prefix}Wilcoxon p = {pair['wilcoxon_p']:.4f}")
+        print(f"{prefix}Cohen’s d = {-pair['cohens_d']:.2f} 95% CI {ci_text((-high, -low))}")
+        print(f"{prefix}Permutation p (compliance) = {pair['permutation_p']:.4f}")
+    print(f"ANOVA p = {anova_p:.4f}")
+    if compared["omnibus"].get("cochran_q_p") is not None:
+        print(f"Cochran's Q p (fix success) = {compared['omnibus']['cochran_q_p']:.4f}")
+
+    # === Visualizations (drawn in parallel from summaries; unchanged charts are kept) ===
+    output_dir = "eval_charts"
+    for s in strategies:
+        df[f"{s}_fixed_pct"] = (df[f"{s}_compliance_score"] > 0) * 100.0
+        df[f"{s}_new_violation_pct"] = df[f"{s}_new_violation"] * 100.0
+
+    charts = [
+        box_chart("boxplot_compliance_scores.png", "Boxplot of Compliance Scores", df, score_columns,
+                  ylabel="Compliance Score", figsize=(10, 6)),
+        bar_chart("barplot_fix_success_rate.png", "Fix Success Rate", labels,
+                  [success_rate[s] for s in strategies], ylabel="Success Rate (%)", figsize=(8, 6)),
+        bar_chart("barplot_new_violation_rate.png", "New Violation Rate", labels,
+                  [new_violation_rate[s] for s in strategies], ylabel="New Violation Rate (%)", figsize=(8, 6))
+    ]
+    charts += rule_and_sc_facets("facet_fix_success_rate.png", "Fix Success Rate", df,
+                                 [f"{s}_fixed_pct" for s in strategies], labels, ylabel="Success Rate (%)")
+    charts += rule_and_sc_facets("facet_new_violation_rate.png", "New Violation Rate", df,
+                                 [f"{s}_new_violation_pct" for s in strategies], labels, ylabel="New Violation Rate (%)")
+    rendered, unchanged = render_charts(charts, output_dir)
+    print(f"\n📊 {summary(rendered, unchanged)}")
+    print(f"Charts saved in: {output_dir}")
@@ -0,0 +1,93 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_batch import write_json
+
+# === Local fake of the batch endpoint (for testing generate_fix.py --batch) ===
+# Works on the directory used by llm_batch.FileBatchBackend: every submitted
+# batch (<root>/<id>/input.jsonl) is answered line by line with the HTML from
+# the prompt's ```html block plus an aria-label, written to output.jsonl in the
+# batch output format, and marked completed.
+#   python "helper scripts/fake_batch_endpoint.py" --root llm_batches/endpoint
+#   python generate_fix.py --batch --batch-backend files
+
+parser = argparse.ArgumentParser(description="Process batches submitted to the on-disk fake endpoint")
+parser.add_argument("--root", default=os.path.join("llm_batches", "endpoint"))
+parser.add_argument("--once", action="store_true", help="process what is pending and exit")
+parser.add_argument("--interval", type=float, default=1.0, help="seconds between directory scans")
+parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an error")
+args = parser.parse_args()
+
+_CODE_BLOCK = re.compile(r"```html\s*\n(.*?)```", re.S)
+_FIRST_TAG = re.compile(r"<([a-zA-Z][\w-]*)")
+
+
+def fake_fix(prompt):
+    match = _CODE_BLOCK.search(prompt)
+    html = match.group(1).strip() if match else "<div></div>"
+    if "aria-label" not in html:
+        html = _FIRST_TAG.sub(lambda m: f'<{m.group(1)} aria-label="Fixed"', html, count=1)
+    return f"```html\n{html}\n```"
+
+
+def answer(request):
+    body = request.get("body", {})
+    if random.random() < args.error_rate:
+        return {"status_code": 500, "body": {"error": {"message": "injected failure"}}}
+    content = fake_fix(body.get("messages", [{}])[-1].get("content", ""))
+    prompt_tokens = sum(len(m.get("content", "")) // 4 + 1 for m in body.get("messages", []))
+    completion_tokens = len(content) // 4 + 1
+    return {"status_code": 200, "body": {
+        "object": "chat.completion",
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }}
+
+
+def process(batch_dir):
+    meta_path = os.path.join(batch_dir, "batch.json")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("status") not in ("validating", "in_progress"):
+        return False
+
+    meta["status"] = "in_progress"
+    write_json(meta_path, meta)
+    with open(os.path.join(batch_dir, "input.jsonl"), "r", encoding="utf-8") as src, \
+            open(os.path.join(batch_dir, "output.jsonl"), "w", encoding="utf-8") as out:
+        for n, line in enumerate(src):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            out.write(json.dumps({
+                "id": f"{meta['id']}-{n}",
+                "custom_id": request["custom_id"],
+                "response": answer(request),
+                "error": None
+            }, ensure_ascii=False) + "\n")
+    meta.update({"status": "completed", "output_file": "output.jsonl", "completed_at": time.time()})
+    write_json(meta_path, meta)
+    print(f"✅ Completed {meta['id']}")
+    return True
+
+
+os.makedirs(args.root, exist_ok=True)
+print(f"🧪 Fake batch endpoint watching {args.root}")
+while True:
+    for name in sorted(os.listdir(args.root)):
+        if os.path.isfile(os.path.join(args.root, name, "batch.json")):
+            process(os.path.join(args.root, name))
+    if args.once:
+        break
+    time.sleep(args.interval)
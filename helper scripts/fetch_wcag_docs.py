@@ -0,0 +1,40 @@
+import os
+import sys
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wcag_retrieval import WCAG_DOCS_DIR
+
+# === Download the WCAG 2.2 Understanding and Techniques pages used by the RAG index ===
+# Saved as wcag_docs/<id>.html; existing files are kept (delete one to refresh it).
+
+BASE = "https://www.w3.org/WAI/WCAG22"
+UNDERSTANDING = ["info-and-relationships", "name-role-value"]
+TECHNIQUES = {
+    "aria": ["ARIA4", "ARIA5", "ARIA6", "ARIA11", "ARIA12", "ARIA13", "ARIA14", "ARIA16", "ARIA17", "ARIA20"],
+    "general": ["G108", "G115", "G117", "G140"],
+    "html": ["H44", "H49", "H65", "H71", "H91"],
+    "failures": ["F59", "F68", "F86", "F111"]
+}
+
+pages = {name: f"{BASE}/Understanding/{name}.html" for name in UNDERSTANDING}
+for folder, ids in TECHNIQUES.items():
+    pages.update({tid: f"{BASE}/Techniques/{folder}/{tid}" for tid in ids})
+
+os.makedirs(WCAG_DOCS_DIR, exist_ok=True)
+with httpx.Client(follow_redirects=True, timeout=30) as client:
+    for doc_id, url in pages.items():
+        path = os.path.join(WCAG_DOCS_DIR, f"{doc_id}.html")
+        if os.path.exists(path):
+            continue
+        try:
+            response = client.get(url)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"❌ {doc_id}: {e}")
+            continue
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"✅ {doc_id} ← {url}")
+
+print(f"\n📁 WCAG documents in: {WCAG_DOCS_DIR}")
@@ -9,12 +9,12 @@ df = df[["rule_id", "source_file", "fix_status"]]
 # Convert fix_status to binary score
 df["score"] = df["fix_status"].apply(lambda x: 1 if "✅" in x else 0)
 
-# Pivot to have one row per rule_id, with CoT and RAG scores as columns
+# Pivot to have one row per rule_id, with one score column per strategy
 pivot_df = df.pivot_table(index="rule_id", columns="source_file", values="score", fill_value=0).reset_index()
 
 # Rename columns clearly
 pivot_df.columns.name = None
-pivot_df = pivot_df.rename(columns={"cot": "cot_score", "rag": "rag_score"})
+pivot_df = pivot_df.rename(columns={c: f"{c}_score" for c in pivot_df.columns if c != "rule_id"})
 
 # Save to CSV
 pivot_df.to_csv("fix_success_scores.csv", index=False)
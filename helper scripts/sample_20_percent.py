@@ -1,41 +1,159 @@
+import os
+import sys
+import heapq
+import argparse
+import numpy as np
 import pandas as pd
-import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from columnar_store import table_columns, iter_batches, write_table, TableWriter
+
+# === Stratified streaming sample of the critical violations ===
+# One pass over the table in batches, never holding it in memory. Every row
+# gets a uniform key from a generator seeded with --seed, drawn in file order,
+# so the keys depend on the seed only (not on the batch size). Within each
+# stratum (WCAG_SC x rule_id) a row is sampled when its key is below
+# --fraction (Bernoulli sampling) and written as it streams past. The rows with
+# the --min-per-stratum smallest keys are always sampled, so rare rules keep at
+# least that many rows (or all of them): per stratum a bounded heap keeps the
+# smallest-key rows at or above --fraction, and the ones a stratum still needs
+# are appended at the end in file order. Both rules pick the smallest keys of
+# the stratum, so each stratum's sample is a uniform random subset.
+
+parser = argparse.ArgumentParser(description="Stratified 20% sample of violations_urls_critical.csv")
+parser.add_argument("--fraction", type=float, default=0.2, help="sampling rate within every stratum")
+parser.add_argument("--min-per-stratum", type=int, default=5,
+                    help="rows kept per stratum even below the sampling rate (all rows of smaller strata)")
+parser.add_argument("--strata", nargs="+", default=["WCAG_SC", "rule_id"], help="columns defining the strata")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--batch-size", type=int, default=65536)
+args = parser.parse_args()
 
 # === Input & Output ===
-input_csv = r"C:\Users\w23063958\OneDrive - Northumbria University - Production Azure AD\MSC PROJECT\1000study\data\violations_urls_critical.csv"
+data_dir = os.environ.get("PIPELINE_DATA_DIR") or r"C:\Users\w23063958\OneDrive - Northumbria University - Production Azure AD\MSC PROJECT\1000study\data"
+input_csv = os.path.join(data_dir, "violations_urls_critical.csv")
 output_csv = input_csv.replace("critical.csv", "critical_sampled_20percent.csv")
+# pipeline.py writes the sample into its experiment folder instead
+if os.environ.get("PIPELINE_EXPERIMENT_DIR"):
+    output_csv = os.path.join(os.environ["PIPELINE_EXPERIMENT_DIR"], os.path.basename(output_csv))
+strata_csv = output_csv.replace(".csv", "_strata.csv")
+
+SC_FILTER = ["1.3.1", "4.1.2"]
+
+columns = table_columns(input_csv)
+strata = [c for c in args.strata if c in columns]
+if not strata:
+    parser.error(f"none of the strata columns {args.strata} are in {input_csv}")
 
-# === Load full critical violation CSV ===
-df = pd.read_csv(input_csv)
-df.fillna("", inplace=True)
 
 # === Optional: Filter only SC 1.3.1 and 4.1.2 ===
-if "WCAG_SC" in df.columns:
-    df = df[df["WCAG_SC"].isin(["1.3.1", "4.1.2"])]
+def keep_mask(batch):
+    if "WCAG_SC" in batch.columns:
+        return batch["WCAG_SC"].fillna("").astype(str).isin(SC_FILTER).to_numpy()
+    return np.ones(len(batch), dtype=bool)
+
+
+def stratum_frame(batch, keys, positions):
+    frame = pd.DataFrame({c: batch[c].fillna("").astype(str).to_numpy() for c in strata})
+    frame["key"] = keys
+    frame["position"] = positions
+    return frame
+
+
+def add_counts(totals, frame):
+    for stratum, size in frame.groupby(strata, sort=False).size().items():
+        stratum = stratum if isinstance(stratum, tuple) else (stratum,)
+        totals[stratum] = totals.get(stratum, 0) + int(size)
+
+
+# === One pass: write the Bernoulli rows, keep each stratum's smallest other keys ===
+rng = np.random.default_rng(args.seed)
+population = {}
+sampled_per_stratum = {}
+smallest = {}  # stratum -> max-heap of (-key, position, row), at most min-per-stratum entries
+total_rows = 0
+count_131 = 0
+count_412 = 0
+sampled_rows = 0
+sampled_count_131 = 0
+sampled_count_412 = 0
+files = set()
+offset = 0
+
+
+def write_sampled(writer, sampled, frame):
+    global sampled_rows, sampled_count_131, sampled_count_412
+    writer.write(sampled)
+    sampled_rows += len(sampled)
+    if "WCAG_SC" in sampled.columns:
+        sc = sampled["WCAG_SC"].astype(str)
+        sampled_count_131 += int((sc == "1.3.1").sum())
+        sampled_count_412 += int((sc == "4.1.2").sum())
+    add_counts(sampled_per_stratum, frame)
+
+
+with TableWriter(output_csv, encoding="utf-8") as writer:
+    for batch in iter_batches(input_csv, batch_size=args.batch_size):
+        keys = rng.random(len(batch))
+        keep = keep_mask(batch)
+        positions = offset + np.flatnonzero(keep)
+        offset += len(batch)
+        batch, keys = batch[keep].reset_index(drop=True), keys[keep]
+
+        total_rows += len(batch)
+        if "WCAG_SC" in batch.columns:
+            sc = batch["WCAG_SC"].astype(str)
+            count_131 += int((sc == "1.3.1").sum())
+            count_412 += int((sc == "4.1.2").sum())
+        if "file" in batch.columns:
+            files.update(batch["file"].fillna("").unique())
+
+        frame = stratum_frame(batch, keys, positions)
+        add_counts(population, frame)
+        chosen = keys < args.fraction
+        if chosen.any():
+            write_sampled(writer, batch[chosen].fillna(""), frame[chosen])
 
-# === Sample 20% of the data ===
-sampled_df = df.sample(frac=0.2, random_state=42)
+        if args.min_per_stratum > 0:
+            # Only each stratum's smallest keys in this batch can enter its heap
+            frame = frame[~chosen].sort_values("key", kind="stable")
+            frame = frame[frame.groupby(strata, sort=False).cumcount() < args.min_per_stratum]
+            for i, row in zip(frame.index, frame.itertuples(index=False)):
+                heap = smallest.setdefault(tuple(row[:len(strata)]), [])
+                if len(heap) < args.min_per_stratum:
+                    heapq.heappush(heap, (-row.key, row.position, batch.iloc[i:i + 1]))
+                elif -heap[0][0] > row.key:
+                    heapq.heapreplace(heap, (-row.key, row.position, batch.iloc[i:i + 1]))
 
-# === Save sampled CSV ===
-sampled_df.to_csv(output_csv, index=False, encoding="utf-8")
+    # Rows the Bernoulli draw missed but the stratum minimum requires, appended in file order
+    top_up = []
+    for stratum, heap in smallest.items():
+        needed = min(args.min_per_stratum, population[stratum]) - sampled_per_stratum.get(stratum, 0)
+        top_up += sorted(heap, reverse=True)[:max(0, needed)]
+    if top_up:
+        top_up.sort(key=lambda entry: entry[1])
+        sampled = pd.concat([row for _, _, row in top_up], ignore_index=True).fillna("")
+        keys = [-key for key, _, _ in top_up]
+        positions = [position for _, position, _ in top_up]
+        write_sampled(writer, sampled, stratum_frame(sampled, keys, positions))
+if writer.rows == 0:
+    write_table(pd.DataFrame(columns=columns), output_csv, encoding="utf-8")
 
-# === Stats for original data ===
-total_rows = len(df)
-count_131 = df[df["WCAG_SC"] == "1.3.1"].shape[0]
-count_412 = df[df["WCAG_SC"] == "4.1.2"].shape[0]
-unique_files = df['file'].nunique() if 'file' in df.columns else "N/A"
+# === Per-stratum population and sample sizes ===
+strata_df = pd.DataFrame(
+    [(*stratum, n, sampled_per_stratum.get(stratum, 0)) for stratum, n in population.items()],
+    columns=strata + ["population", "sampled"]
+).sort_values(strata).reset_index(drop=True)
+strata_df.to_csv(strata_csv, index=False)
 
-# === Stats for sampled data ===
-sampled_rows = len(sampled_df)
-sampled_count_131 = sampled_df[sampled_df["WCAG_SC"] == "1.3.1"].shape[0]
-sampled_count_412 = sampled_df[sampled_df["WCAG_SC"] == "4.1.2"].shape[0]
+unique_files = len(files) if "file" in columns else "N/A"
 
 # === Generate Summary Report ===
 summary = (
     f"After filtering and vectorizing accessibility data, the final dataset included "
     f"{total_rows:,} critical violations – {count_131:,} under WCAG SC 1.3.1 (Info and Relationships) "
     f"and {count_412:,} under SC 4.1.2 (Name, Role, Value) – from {unique_files:,} parsed HTML files.\n"
-    f"A 20% sample containing {sampled_rows:,} rows has been saved: "
+    f"A {args.fraction:.0%} sample containing {sampled_rows:,} rows has been saved: "
     f"{sampled_count_131:,} (SC 1.3.1), {sampled_count_412:,} (SC 4.1.2)."
 )
 
@@ -48,5 +166,6 @@ with open(summary_path, "w", encoding="utf-8") as f:
     f.write(summary)
 
 print(f"\n📝 Summary saved to: {summary_path}")
-print(f"✅ Sampled 20% saved to:\n{output_csv}")
+print(f"✅ Sampled {args.fraction:.0%} saved to:\n{output_csv}")
+print(f"🧮 {len(strata_df):,} strata ({', '.join(strata)}), at least {args.min_per_stratum} rows each: {strata_csv}")
 print(f"📊 Original: {total_rows} rows → Sampled: {sampled_rows} rows")
@@ -1,8 +1,13 @@
+import os
+import sys
 import pandas as pd
 from scipy.stats import shapiro, ttest_rel, wilcoxon
 from numpy import mean, std
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from resampling import paired_comparison
+
 # Load the fix success scores CSV
 df = pd.read_csv("fix_success_scores.csv")
 
@@ -56,3 +61,22 @@ summary_df = pd.DataFrame(output_summary)
 summary_df.to_csv("statistical_analysis_summary.csv", index=False)
 
 print("\n📄 Results saved to: statistical_analysis_summary.csv")
+
+# === Bootstrap CI for Cohen's d and the mean difference, paired permutation test ===
+resampled = paired_comparison(cot_scores, rag_scores)
+low, high = resampled["cohens_d"]["ci"]
+print(f"\n🎲 Bootstrap ({resampled['resamples']:,} resamples): Cohen's d 95% CI [{low:.4f}, {high:.4f}]")
+print(f"🎲 Permutation test p-value (mean difference): {resampled['permutation_p']['mean_difference']:.4f}")
+
+pd.DataFrame({
+    "Cohen's d": [d],
+    "Cohen's d CI low": [low],
+    "Cohen's d CI high": [high],
+    "Mean difference": [resampled["mean_difference"]["estimate"]],
+    "Mean difference CI low": [resampled["mean_difference"]["ci"][0]],
+    "Mean difference CI high": [resampled["mean_difference"]["ci"][1]],
+    "Permutation p": [resampled["permutation_p"]["mean_difference"]],
+    "Resamples": [resampled["resamples"]],
+    "Seed": [resampled["seed"]]
+}).to_csv("statistical_resampling_summary.csv", index=False)
+print("📄 Resampling results saved to: statistical_resampling_summary.csv")
@@ -0,0 +1,92 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# === Local stand-in for the chat-completions API (for testing generate_fix.py) ===
+# Answers POST /chat/completions (and /v1/chat/completions) by echoing the HTML
+# from the prompt's ```html block with an aria-label added. Latency, 429s and
+# 5xx errors can be injected to exercise the client's rate limiting and retries.
+#   python "helper scripts/stub_llm_server.py" --port 8089 --error-rate 0.1
+#   LLM_BASE_URL=http://127.0.0.1:8089/v1 python generate_fix.py
+
+parser = argparse.ArgumentParser(description="Stub chat-completions server")
+parser.add_argument("--port", type=int, default=8089)
+parser.add_argument("--latency", type=float, default=0.05, help="seconds per response")
+parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429/500/503")
+parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After seconds sent with 429s")
+args = parser.parse_args()
+
+_CODE_BLOCK = re.compile(r"```html\s*\n(.*?)```", re.S)
+_FIRST_TAG = re.compile(r"<([a-zA-Z][\w-]*)")
+
+counts = {"requests": 0, "errors": 0}
+counts_lock = threading.Lock()
+
+
+def fake_fix(prompt):
+    match = _CODE_BLOCK.search(prompt)
+    html = match.group(1).strip() if match else "<div></div>"
+    if "aria-label" not in html:
+        html = _FIRST_TAG.sub(lambda m: f'<{m.group(1)} aria-label="Fixed"', html, count=1)
+    return f"```html\n{html}\n```"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with counts_lock:
+            counts["requests"] += 1
+
+        time.sleep(args.latency)
+        if random.random() < args.error_rate:
+            with counts_lock:
+                counts["errors"] += 1
+            status = random.choice([429, 500, 503])
+            headers = {"Retry-After": str(args.retry_after)} if status == 429 else {}
+            self._send(status, {"error": {"message": "injected failure"}}, headers)
+            return
+
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        content = fake_fix(prompt)
+        prompt_tokens = sum(len(m.get("content", "")) // 4 + 1 for m in payload.get("messages", []))
+        completion_tokens = len(content) // 4 + 1
+        self._send(200, {
+            "id": f"stub-{counts['requests']}",
+            "object": "chat.completion",
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    def log_message(self, *a):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+print(f"🧪 Stub LLM listening on http://127.0.0.1:{args.port}/v1 (error rate {args.error_rate:.0%})")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+print(f"📨 Served {counts['requests']} requests ({counts['errors']} injected errors)")
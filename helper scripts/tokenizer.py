@@ -1,11 +1,17 @@
+import os
+import sys
 import pandas as pd
-import tiktoken
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from prompt_budget import count_tokens
 
 df = pd.read_csv("prompts_cot_rag_mapped.csv")
-tokenizer = tiktoken.encoding_for_model("gpt-4")
 
-df["cot_tokens"] = df["cot_prompt"].apply(lambda x: len(tokenizer.encode(str(x))))
-df["rag_tokens"] = df["rag_prompt"].apply(lambda x: len(tokenizer.encode(str(x))))
+# Counts recorded by generate_prompts.py --token-budget are reused as-is
+if "cot_tokens" not in df.columns:
+    df["cot_tokens"] = df["cot_prompt"].apply(count_tokens)
+if "rag_tokens" not in df.columns:
+    df["rag_tokens"] = df["rag_prompt"].apply(count_tokens)
 df["total_tokens"] = df["cot_tokens"] + df["rag_tokens"]
 
 print(df[["file", "cot_tokens", "rag_tokens", "total_tokens"]].head())
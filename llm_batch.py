@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import httpx
+
+from completion_cache import completion_key
+from llm_client import RETRY_STATUS, MAX_RETRIES, backoff_delay
+
+# === Offline batch submission for fix generation ===
+# Pending (custom_id, messages) jobs are packed into JSONL request files in the
+# chat-completions batch format, submitted, polled until they finish, and the
+# responses are written into the same checkpoint the interactive engine uses,
+# keyed by custom_id. Submitted batch ids are kept in a small state file so a
+# restarted run polls the batches it already paid for instead of resubmitting.
+# Status polls and result downloads are retried like interactive requests
+# (408/409/429/5xx, timeouts, dropped connections) so one transient error does
+# not abort the wait.
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+POLL_INTERVAL = 30
+TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_batch_files(jobs, model, params, work_dir,
+                      max_requests=MAX_BATCH_REQUESTS, max_bytes=MAX_BATCH_BYTES):
+    # Files are named by a hash of their content, so an unchanged batch keeps its name
+    os.makedirs(work_dir, exist_ok=True)
+    paths = []
+    lines, size = [], 0
+
+    def flush():
+        payload = "".join(lines)
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(work_dir, f"batch_{digest}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        paths.append(path)
+
+    for custom_id, messages in jobs:
+        line = json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {"model": model, "messages": messages, **params}
+        }, ensure_ascii=False) + "\n"
+        line_size = len(line.encode("utf-8"))
+        if lines and (len(lines) >= max_requests or size + line_size > max_bytes):
+            flush()
+            lines, size = [], 0
+        lines.append(line)
+        size += line_size
+    if lines:
+        flush()
+    return paths
+
+
+def parse_result_line(line):
+    # One batch output line -> checkpoint record
+    item = json.loads(line)
+    response = item.get("response") or {}
+    body = response.get("body") or {}
+    if item.get("error") or response.get("status_code") != 200:
+        error = item.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+        return {"key": item["custom_id"], "error": json.dumps(error) if not isinstance(error, str) else error}
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return {"key": item["custom_id"], "error": f"malformed response body: {json.dumps(body)[:200]}"}
+    return {"key": item["custom_id"], "content": content, "usage": body.get("usage") or {}}
+
+
+def with_retries(call, *args, max_retries=MAX_RETRIES):
+    for attempt in range(max_retries + 1):
+        retry_after = None
+        try:
+            return call(*args)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in RETRY_STATUS or attempt == max_retries:
+                raise
+            error = f"HTTP {e.response.status_code}"
+            retry_after = e.response.headers.get("retry-after")
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            if attempt == max_retries:
+                raise
+            error = e
+        delay = backoff_delay(attempt, retry_after)
+        print(f"⚠️ {error}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+# === Backends: the hosted Batch API, or a directory on disk (local fake endpoint) ===
+class ApiBatchBackend:
+    def __init__(self, base_url, api_key=None, timeout=300):
+        api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.http = httpx.Client(base_url=base_url.rstrip("/"), headers=headers, timeout=timeout)
+
+    def submit(self, path):
+        with open(path, "rb") as f:
+            upload = self.http.post("/files", data={"purpose": "batch"},
+                                    files={"file": (os.path.basename(path), f, "application/jsonl")})
+        upload.raise_for_status()
+        batch = self.http.post("/batches", json={
+            "input_file_id": upload.json()["id"],
+            "endpoint": BATCH_ENDPOINT,
+            "completion_window": "24h"
+        })
+        batch.raise_for_status()
+        return batch.json()["id"]
+
+    def status(self, batch_id):
+        response = self.http.get(f"/batches/{batch_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def results(self, batch):
+        lines = []
+        for key in ("output_file_id", "error_file_id"):
+            if batch.get(key):
+                response = self.http.get(f"/files/{batch[key]}/content")
+                response.raise_for_status()
+                lines.extend(line for line in response.text.splitlines() if line.strip())
+        return lines
+
+    def close(self):
+        self.http.close()
+
+
+class FileBatchBackend:
+    # <root>/<batch id>/input.jsonl + batch.json; a worker (helper scripts/fake_batch_endpoint.py)
+    # writes output.jsonl and sets the status in batch.json
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _meta_path(self, batch_id):
+        return os.path.join(self.root, batch_id, "batch.json")
+
+    def submit(self, path):
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        os.makedirs(os.path.join(self.root, batch_id))
+        shutil.copyfile(path, os.path.join(self.root, batch_id, "input.jsonl"))
+        meta = {"id": batch_id, "status": "validating", "created_at": time.time(), "output_file": None}
+        write_json(self._meta_path(batch_id), meta)
+        return batch_id
+
+    def status(self, batch_id):
+        with open(self._meta_path(batch_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def results(self, batch):
+        if not batch.get("output_file"):
+            return []
+        with open(os.path.join(self.root, batch["id"], batch["output_file"]), "r", encoding="utf-8") as f:
+            return [line for line in f if line.strip()]
+
+    def close(self):
+        pass
+
+
+def write_json(path, data):
+    # Written to a temp file and renamed so readers never see half a file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+# === Submit, poll and collect; returns {custom_id: record} like run_jobs() ===
+def run_batches(backend, jobs, checkpoint, model, params, work_dir, cache=None,
+                poll_interval=POLL_INTERVAL, state_path=None):
+    state_path = state_path or os.path.join(work_dir, "submitted.json")
+    stats = {"batches": 0, "submitted": 0, "cached": 0, "failed": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    pending = []
+    for key, messages in jobs:
+        if "content" in checkpoint.done.get(key, {}):
+            continue
+        cached = cache.get(completion_key(model, params, messages)) if cache is not None else None
+        if cached is not None:
+            checkpoint.write({"key": key, **cached})
+            stats["cached"] += 1
+            continue
+        pending.append((key, messages))
+    messages_by_key = dict(pending)
+
+    submitted = {}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            submitted = json.load(f)
+
+    for path in write_batch_files(pending, model, params, work_dir) if pending else []:
+        name = os.path.basename(path)
+        if name not in submitted:
+            submitted[name] = backend.submit(path)
+            write_json(state_path, submitted)
+            print(f"📤 Submitted {name} as {submitted[name]}")
+        stats["batches"] += 1
+    stats["submitted"] = len(pending)
+
+    while submitted:
+        for name, batch_id in list(submitted.items()):
+            batch = with_retries(backend.status, batch_id)
+            if batch.get("status") not in TERMINAL_STATES:
+                continue
+            for line in with_retries(backend.results, batch):
+                record = parse_result_line(line)
+                checkpoint.write(record)
+                if "content" in record:
+                    usage = record["usage"]
+                    stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                    stats["completion_tokens"] += usage.get("completion_tokens", 0)
+                    if cache is not None and record["key"] in messages_by_key:
+                        cache.put(completion_key(model, params, messages_by_key[record["key"]]), model, record)
+                else:
+                    stats["failed"] += 1
+            print(f"📥 {name} ({batch_id}) finished: {batch.get('status')}")
+            del submitted[name]
+            write_json(state_path, submitted)
+        if submitted:
+            time.sleep(poll_interval)
+
+    return checkpoint.done, stats
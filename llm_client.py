@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import random
+import asyncio
+import httpx
+
+from completion_cache import completion_key
+from prompt_budget import count_tokens
+
+# === Async chat-completions client with concurrency and rate-limit budgeting ===
+# Requests run concurrently up to a fixed limit, and each one first takes its
+# share of the request-per-minute and token-per-minute budgets (token buckets
+# refilled continuously). 429 and 5xx answers, timeouts and dropped connections
+# are retried with full-jitter exponential backoff, honouring Retry-After.
+
+DEFAULT_BASE_URL = os.environ.get("LLM_BASE_URL", "https://api.openai.com/v1")
+DEFAULT_MODEL = os.environ.get("LLM_MODEL", "gpt-4")
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RPM = 500
+DEFAULT_TPM = 30000
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+REQUEST_TIMEOUT = 120
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+estimate_tokens = count_tokens
+
+
+def backoff_delay(attempt, retry_after=None):
+    # Full-jitter exponential backoff; Retry-After (seconds) wins when the server sends it
+    if retry_after is not None:
+        try:
+            return min(BACKOFF_CAP, float(retry_after)) + random.uniform(0, BACKOFF_BASE)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucket:
+    # `rate` units per minute; a request larger than the bucket waits for a full bucket
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def take(self, amount):
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    # Give back (or charge) the difference once the real usage is known
+    def settle(self, amount):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMClient:
+    def __init__(self, base_url=DEFAULT_BASE_URL, api_key=None, model=DEFAULT_MODEL,
+                 concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM,
+                 max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT, params=None, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.model = model
+        self.params = dict(params or {})
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.cache = cache  # CompletionCache, or None to always call the API
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._http = None
+
+    async def __aenter__(self):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self._http = httpx.AsyncClient(base_url=self.base_url, headers=headers, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._http.aclose()
+
+    def _backoff(self, attempt, retry_after=None):
+        return backoff_delay(attempt, retry_after)
+
+    async def complete(self, messages):
+        cache_key = None
+        if self.cache is not None:
+            cache_key = completion_key(self.model, self.params, messages)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        payload = {"model": self.model, "messages": messages, **self.params}
+        budget = sum(estimate_tokens(m.get("content", "")) for m in messages) + self.params.get("max_tokens", 512)
+
+        async with self.semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.requests.take(1)
+                await self.tokens.take(budget)
+                self.stats["requests"] += 1
+                retry_after = None
+                try:
+                    response = await self._http.post("/chat/completions", json=payload)
+                    if response.status_code == 200:
+                        data = response.json()
+                        usage = data.get("usage") or {}
+                        used = usage.get("total_tokens")
+                        if used is not None:
+                            self.tokens.settle(budget - used)
+                        self.stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                        self.stats["completion_tokens"] += usage.get("completion_tokens", 0)
+                        result = {
+                            "content": data["choices"][0]["message"]["content"],
+                            "usage": usage
+                        }
+                        if cache_key is not None:
+                            self.cache.put(cache_key, self.model, result)
+                        return result
+                    if response.status_code not in RETRY_STATUS:
+                        raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                    error = LLMError(f"HTTP {response.status_code}")
+                    retry_after = response.headers.get("retry-after")
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    error = e
+
+                if attempt == self.max_retries:
+                    self.stats["failures"] += 1
+                    raise LLMError(f"gave up after {attempt + 1} attempts: {error}")
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+
+# === Incremental results: one JSON line per finished request, fsynced ===
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    self.done[record["key"]] = record
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self.done[record["key"]] = record
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# Runs every (key, messages) job without a successful record in the checkpoint; returns {key: record}
+async def run_jobs(client, jobs, checkpoint, progress_every=100):
+    pending = [
+        (key, messages) for key, messages in jobs
+        if key not in checkpoint.done or "error" in checkpoint.done[key]
+    ]
+    finished = 0
+
+    async def run(key, messages):
+        nonlocal finished
+        try:
+            result = await client.complete(messages)
+            record = {"key": key, "content": result["content"], "usage": result["usage"]}
+        except Exception as e:
+            record = {"key": key, "error": str(e)}
+        checkpoint.write(record)
+        finished += 1
+        if progress_every and finished % progress_every == 0:
+            print(f"   ... {finished}/{len(pending)} completions")
+
+    await asyncio.gather(*(run(key, messages) for key, messages in pending))
+    return checkpoint.done
@@ -0,0 +1,163 @@
+import ast
+import json
+from collections import namedtuple, defaultdict
+from bs4 import BeautifulSoup
+
+# === Per-page node index for locating flagged elements ===
+# Built once per parsed page: tag, id, role and aria-* values map straight to
+# their nodes (document order), and Axe target selectors are resolved once and
+# memoised. Every lookup returns a NodeMatch carrying how the node was found
+# and a 0-1 confidence, instead of silently falling back to the first tag.
+
+NodeMatch = namedtuple("NodeMatch", ["node", "confidence", "method"])
+
+INDEXED_ATTRS = ("id", "role")
+TAG_FALLBACK_CONFIDENCE = 0.1
+
+
+def _value(value):
+    return " ".join(value) if isinstance(value, list) else value
+
+
+def _features(tag):
+    # Identifying attributes of a node: id, role and every aria-* attribute
+    return {
+        k: _value(v) for k, v in tag.attrs.items()
+        if k in INDEXED_ATTRS or k.startswith("aria-")
+    }
+
+
+def _agrees(node, snippet_tag):
+    # A selector hit must still look like the flagged element: same tag, same id
+    if node.name != snippet_tag.name:
+        return False
+    snippet_id = _value(snippet_tag.get("id"))
+    return not snippet_id or _value(node.get("id")) == snippet_id
+
+
+def normalize_target(target):
+    # Axe "target" arrives as a list (possibly nested for iframes/shadow DOM) or
+    # as its str()/JSON form after a CSV round-trip; the last selector is the node.
+    if isinstance(target, str):
+        text = target.strip()
+        if text.startswith("["):
+            try:
+                target = json.loads(text)
+            except ValueError:
+                try:
+                    target = ast.literal_eval(text)
+                except (ValueError, SyntaxError):
+                    return text or None
+        else:
+            return text or None
+    while isinstance(target, (list, tuple)) and target:
+        target = target[-1]
+    return target if isinstance(target, str) and target else None
+
+
+class NodeIndex:
+    def __init__(self, soup):
+        self.soup = soup
+        self.by_tag = defaultdict(list)
+        self.by_attr = defaultdict(list)  # (tag, attr, value) -> nodes
+        self.by_id = defaultdict(list)    # id -> nodes, any tag
+        self.position = {}
+        self._selectors = {}
+        for position, node in enumerate(soup.find_all(True)):
+            self.position[id(node)] = position
+            self.by_tag[node.name].append(node)
+            for attr, value in _features(node).items():
+                self.by_attr[(node.name, attr, value)].append(node)
+                if attr == "id":
+                    self.by_id[value].append(node)
+
+    def select(self, selector):
+        if selector not in self._selectors:
+            if selector.startswith("#") and all(c not in selector for c in " >+~.[:"):
+                nodes = self.by_id.get(selector[1:], [])
+            else:
+                try:
+                    nodes = self.soup.select(selector)
+                except Exception:
+                    nodes = []
+            self._selectors[selector] = nodes
+        return self._selectors[selector]
+
+    def locate(self, snippet, target=None, fallback=False):
+        snippet_tag = BeautifulSoup(snippet or "", "html.parser").find()
+
+        # 1. The Axe target selector, when it resolves to a single node matching the snippet
+        selector = normalize_target(target)
+        if selector:
+            nodes = self.select(selector)
+            if len(nodes) == 1 and (snippet_tag is None or _agrees(nodes[0], snippet_tag)):
+                return NodeMatch(nodes[0], 1.0, "target")
+
+        if not snippet_tag:
+            return None
+
+        # 2. Candidates sharing an identifying attribute with the snippet, scored by overlap
+        features = _features(snippet_tag)
+        scores = {}
+        order = {}
+        for attr, value in features.items():
+            for node in self.by_attr.get((snippet_tag.name, attr, value), ()):
+                weight = 2 if attr == "id" else 1
+                scores[id(node)] = scores.get(id(node), 0) + weight
+                order.setdefault(id(node), node)
+
+        if scores:
+            total = sum(2 if attr == "id" else 1 for attr in features)
+            best_id = max(scores, key=lambda k: (scores[k], -self.position[k]))
+            best = order[best_id]
+            method = "id" if features.get("id") and _value(best.get("id")) == features["id"] else "attributes"
+            return NodeMatch(best, round(scores[best_id] / total, 2), method)
+
+        # 3. Same tag only: low confidence, callers decide whether to accept it
+        if fallback and self.by_tag.get(snippet_tag.name):
+            return NodeMatch(self.by_tag[snippet_tag.name][0], TAG_FALLBACK_CONFIDENCE, "tag")
+        return None
+
+
+# === Attribute Axe findings back to the wrapped fix that contains them ===
+# Used for page-level documents where every fix sits in an element carrying
+# `attr` (e.g. <section data-row="12">). Returns {owner: {section: [rules]}}
+# with owner None for nodes outside any wrapped fix and UNRESOLVED for nodes
+# whose target could not be found again. Nodes tagged in the browser
+# (node["owner"], see axe_pool.scan_html) are trusted as is; others are
+# located by re-selecting their target in `soup`, which can miss where the
+# browser changed the tree (e.g. an inserted <tbody>).
+UNRESOLVED = "?"
+
+
+def attribute_findings(soup, axe_result, attr="data-row", sections=("violations", "incomplete")):
+    owners = {}
+    selectors = {}
+    for section in sections:
+        for rule in axe_result.get(section, []):
+            seen = set()
+            for node in rule.get("nodes", []):
+                if "owner" in node:
+                    owner = node["owner"]
+                    if owner not in seen:
+                        seen.add(owner)
+                        owners.setdefault(owner, {s: [] for s in sections})[section].append(rule)
+                    continue
+                selector = normalize_target(node.get("target"))
+                if selector not in selectors:
+                    try:
+                        selectors[selector] = soup.select_one(selector) if selector else None
+                    except Exception:
+                        selectors[selector] = None
+                found = selectors[selector]
+                if found is None:
+                    owner = UNRESOLVED
+                else:
+                    if not found.has_attr(attr):
+                        found = found.find_parent(attrs={attr: True})
+                    owner = found.get(attr) if found is not None else None
+                if owner in seen:
+                    continue
+                seen.add(owner)
+                owners.setdefault(owner, {s: [] for s in sections})[section].append(rule)
+    return owners
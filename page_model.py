@@ -0,0 +1,149 @@
+import os
+import uuid
+import threading
+from collections import OrderedDict
+from bs4 import BeautifulSoup, NavigableString
+
+from node_index import NodeIndex
+
+# === Shared page model: parse each source page once, splice variants as text ===
+# Pages are parsed once with a fast parser and kept in a small LRU keyed by
+# path. A variant document (original page with one node replaced by a fix) is
+# produced by serialising the page once around the node and splicing the fix
+# text in, instead of copying or re-parsing the whole tree per variant. Each
+# page keeps one serialised copy plus the (start, end) offsets of every node
+# spliced so far, so memory does not grow with the number of fixes per page.
+
+try:
+    import lxml  # noqa: F401
+    PAGE_PARSER = "lxml"
+except ImportError:
+    PAGE_PARSER = "html.parser"
+
+PAGE_CACHE_SIZE = 32
+
+
+class PageModel:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "r", encoding="utf-8") as f:
+            self.soup = BeautifulSoup(f.read(), PAGE_PARSER)
+        # Held while matching and splicing: splice() briefly edits the shared tree
+        self.lock = threading.RLock()
+        self._text = None
+        self._splits = {}  # id(node) -> (start, end) of its serialisation in _text
+        self._index = None
+
+    # Node index over the parsed tree, built on first use
+    @property
+    def index(self):
+        with self.lock:
+            if self._index is None:
+                self._index = NodeIndex(self.soup)
+            return self._index
+
+    # Offsets of `node` in the serialised page (an empty span at the end of <body> for None)
+    def span(self, node):
+        key = id(node) if node is not None else None
+        with self.lock:
+            if key in self._splits:
+                return self._splits[key]
+            if self._text is None:
+                self._text = str(self.soup)
+
+            marker = f"page-model-splice-{uuid.uuid4().hex}"
+            placeholder = NavigableString(marker)
+            if node is not None:
+                node.replace_with(placeholder)
+            else:
+                self.soup.body.append(placeholder)
+            try:
+                text = str(self.soup)
+            finally:
+                if node is not None:
+                    placeholder.replace_with(node)
+                else:
+                    placeholder.extract()
+
+            # Only the node's own markup differs from the plain serialisation
+            start = text.index(marker)
+            end = len(self._text) - (len(text) - start - len(marker))
+            self._splits[key] = (start, end)
+            return start, end
+
+    # Serialised page split around `node` (or at the end of <body> when node is None)
+    def splice(self, node):
+        start, end = self.span(node)
+        return self._text[:start], self._text[end:]
+
+    def render(self, node, replacement_html):
+        start, end = self.span(node)
+        return self._text[:start] + replacement_html + self._text[end:]
+
+    # One document with several non-overlapping nodes replaced (None = append to <body>)
+    def render_many(self, replacements):
+        placed = []
+        with self.lock:
+            try:
+                for node, _ in replacements:
+                    marker = f"page-model-splice-{uuid.uuid4().hex}"
+                    placeholder = NavigableString(marker)
+                    if node is not None:
+                        node.replace_with(placeholder)
+                    else:
+                        self.soup.body.append(placeholder)
+                    placed.append((node, placeholder, marker))
+                text = str(self.soup)
+            finally:
+                for node, placeholder, _ in reversed(placed):
+                    if node is not None:
+                        placeholder.replace_with(node)
+                    else:
+                        placeholder.extract()
+
+        for (_, replacement_html), (_, _, marker) in zip(replacements, placed):
+            text = text.replace(marker, replacement_html, 1)
+        return text
+
+
+# === Split matched nodes into a non-overlapping batch and the rest ===
+# Two fixes overlap when they target the same node or one node contains the
+# other; only the first of them can go into a page-level document.
+def partition_overlapping(items):
+    accepted, deferred = [], []
+    accepted_ids = set()
+    covered = set()  # ancestors of accepted nodes
+    for key, node in items:
+        if node is None:
+            accepted.append((key, node))
+            continue
+        ancestors = {id(parent) for parent in node.parents}
+        if id(node) in accepted_ids or id(node) in covered or ancestors & accepted_ids:
+            deferred.append((key, node))
+            continue
+        accepted.append((key, node))
+        accepted_ids.add(id(node))
+        covered |= ancestors
+    return accepted, deferred
+
+
+# === Bounded LRU of parsed pages (shared by threads) ===
+_pages = OrderedDict()
+_pages_lock = threading.Lock()
+
+
+def load_page(path, cache_size=PAGE_CACHE_SIZE):
+    key = os.path.abspath(path)
+    with _pages_lock:
+        page = _pages.get(key)
+        if page is not None:
+            _pages.move_to_end(key)
+            return page
+
+    page = PageModel(path)
+    with _pages_lock:
+        page = _pages.setdefault(key, page)
+        _pages.move_to_end(key)
+        while len(_pages) > cache_size:
+            _pages.popitem(last=False)
+    return page
@@ -0,0 +1,344 @@
+import os
+import ast
+import sys
+import json
+import time
+import shlex
+import fnmatch
+import hashlib
+import argparse
+import threading
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from strategies import DEFAULT_STRATEGIES
+
+# === End-to-end pipeline runner ===
+# The standalone scripts are declared as stages with explicit input and output
+# files; dependencies follow from which stage produces which file. A stage is
+# skipped when its inputs, its code (the script plus the repo modules it
+# imports) and its arguments hash the same as on its last successful run and
+# its outputs are still in place, so rerunning after a failure resumes at the
+# stage that failed. Stages whose dependencies are done run concurrently, e.g.
+# the per-strategy rescans (one per EVAL_STRATEGIES entry). Every stage runs in the experiment folder, with its
+# output in pipeline_logs/<stage>.log.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+HELPERS = os.path.join(REPO_DIR, "helper scripts")
+STATE_FILE = "pipeline_state.json"
+LOG_DIR = "pipeline_logs"
+# Files of a scan tree that count as stage input (reports and the pages they describe)
+SCAN_PATTERNS = ("*.json", "*.html", "*.htm")
+
+Stage = namedtuple("Stage", ["name", "script", "args", "inputs", "outputs"])
+
+
+class MissingInput(Exception):
+    pass
+
+
+def define_stages(data_dir):
+    # Relative paths live in the experiment folder (the working directory of every stage)
+    data = lambda name: os.path.join(data_dir, name)
+    return [
+        Stage("extract", os.path.join(REPO_DIR, "extraction.py"), [],
+              [data_dir],
+              [data("violation_counts_per_file.csv")]),
+        # violations_urls_critical.csv (one row per flagged node) is exported into the
+        # data folder outside these scripts; stages reading it wait until it exists
+        Stage("sample", os.path.join(HELPERS, "sample_20_percent.py"), [],
+              [data("violations_urls_critical.csv")],
+              ["violations_urls_critical_sampled_20percent.csv"]),
+        Stage("cluster", os.path.join(HELPERS, "cluster_violations.py"),
+              ["--input", data("violations_urls_critical.csv"), "--output", "clustered_violations.json"],
+              [data("violations_urls_critical.csv")],
+              ["clustered_violations.json"]),
+        Stage("map_rules", os.path.join(HELPERS, "map_direct_to_wcag_rules.py"), [],
+              ["clustered_violations.json"],
+              ["clustered_direct_violations_mapped.json", "clustered_direct_violations_mapped.csv"]),
+        Stage("pre_count", os.path.join(HELPERS, "violation_count.py"), [],
+              ["clustered_violations.json"],
+              ["pre_fix_violation_summary.csv"]),
+        Stage("prompts", os.path.join(REPO_DIR, "generate_prompts.py"),
+              ["--strategies", *DEFAULT_STRATEGIES],
+              ["violations_urls_critical_sampled_20percent.csv"],
+              ["prompts_cot_rag.csv", "prompt_groups.csv"]),
+        Stage("generate_fix", os.path.join(REPO_DIR, "generate_fix.py"),
+              ["--strategies", *DEFAULT_STRATEGIES],
+              ["prompts_cot_rag.csv", "prompt_groups.csv"],
+              ["results_cot_rag_generated.json", "results_cot_rag_generated.parquet", "results_generated_long.parquet"]),
+        Stage("embed", os.path.join(REPO_DIR, "embed_fixes_into_html.py"), [],
+              ["results_cot_rag_generated.json"],
+              ["html_fixes_embedded"]),
+    ] + [
+        Stage(f"rescan_{strategy}", os.path.join(HELPERS, "axecore_rerun.py"),
+              # one scan cache for every strategy, so identical fixes are scanned once
+              ["--fix-types", strategy, "--output-dir", f"axe_reports_{strategy}",
+               "--scan-cache-db", "axe_scan_cache.sqlite"],
+              ["results_cot_rag_generated.parquet"],
+              [f"axe_reports_{strategy}/axe_evaluation_summary.csv"])
+        for strategy in DEFAULT_STRATEGIES
+    ] + [
+        # Grouped_Violations_with_HTML_Column.xlsx and fix_evaluation_table.xlsx are
+        # prepared by hand; the stages below wait until they exist
+        Stage("before_after", os.path.join(HELPERS, "analyse_before_after.py"), [],
+              ["pre_fix_violation_summary.csv", "Grouped_Violations_with_HTML_Column.xlsx"],
+              ["Fix_Evaluation_Table.csv"]),
+        Stage("eval_charts", os.path.join(HELPERS, "evaluation_pipeline.py"), [],
+              ["Fix_Evaluation_Table.csv"],
+              ["eval_charts"]),
+        Stage("analysis", os.path.join(REPO_DIR, "analysis.py"), [],
+              ["fix_evaluation_table.xlsx"],
+              ["evaluation_results.json", "evaluation_results.csv"]),
+    ]
+
+
+def dependencies(stages):
+    producer = {}
+    for stage in stages:
+        for path in stage.outputs:
+            producer[os.path.normpath(path)] = stage.name
+    return {
+        stage.name: sorted({producer[os.path.normpath(p)] for p in stage.inputs if os.path.normpath(p) in producer} - {stage.name})
+        for stage in stages
+    }
+
+
+def upstream(deps, names):
+    wanted, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+    return wanted
+
+
+# === Code a stage runs: the script and the repo modules it imports (transitively) ===
+def code_files(script):
+    seen, todo = [], [script]
+    while todo:
+        path = todo.pop()
+        if path in seen or not os.path.isfile(path):
+            continue
+        seen.append(path)
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            names = [a.name for a in node.names] if isinstance(node, ast.Import) else \
+                [node.module] if isinstance(node, ast.ImportFrom) and node.module and not node.level else []
+            for name in names:
+                todo.append(os.path.join(REPO_DIR, name.split(".")[0] + ".py"))
+    return sorted(seen)
+
+
+# === Hashing: file contents (memoised on size + mtime), directories by listing and stat ===
+class Hasher:
+    def __init__(self, memo, lock):
+        self.memo = memo
+        self._lock = lock
+
+    def file(self, path):
+        stat = os.stat(path)
+        stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+        with self._lock:
+            cached = self.memo.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self._lock:
+            self.memo[path] = [stamp, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def tree(self, root, exclude=(), patterns=("*",)):
+        # Scan folders hold thousands of reports: listed with size and mtime, not read
+        digest = hashlib.sha256()
+        for folder, dirs, files in os.walk(root):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(folder, name)
+                if os.path.normpath(path) in exclude or not any(fnmatch.fnmatch(name, p) for p in patterns):
+                    continue
+                stat = os.stat(path)
+                digest.update(f"{os.path.relpath(path, root)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, path, exclude=()):
+        if os.path.isdir(path):
+            return self.tree(path, exclude, SCAN_PATTERNS)
+        if os.path.isfile(path):
+            return self.file(path)
+        raise MissingInput(path)
+
+
+def stage_signature(stage, extra_args, hasher, exclude):
+    parts = {
+        "args": stage.args + extra_args,
+        "code": {os.path.relpath(p, REPO_DIR): hasher.file(p) for p in code_files(stage.script)},
+        "inputs": {p: hasher.path(p, exclude) for p in stage.inputs}
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def outputs_signature(stage, hasher):
+    return {p: hasher.tree(p) if os.path.isdir(p) else hasher.file(p) for p in stage.outputs}
+
+
+def write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+# === Run one stage (or skip it); called from the worker threads ===
+def run_stage(stage, extra_args, state, hasher, exclude, env, lock, dry_run=False, force=False):
+    signature = stage_signature(stage, extra_args, hasher, exclude)
+    previous = state["stages"].get(stage.name, {})
+    if not force and previous.get("signature") == signature and all(os.path.exists(p) for p in stage.outputs):
+        if previous.get("outputs") == outputs_signature(stage, hasher):
+            return "skipped", 0.0
+    if dry_run:
+        return "would run", 0.0
+
+    print(f"▶️ {stage.name}")
+    log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+    command = [sys.executable, stage.script] + stage.args + extra_args
+    started = time.time()
+    with open(log_path, "w", encoding="utf-8") as log:
+        log.write(f"$ {shlex.join(command)}\n\n")
+        log.flush()
+        code = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+    duration = time.time() - started
+    if code != 0:
+        raise RuntimeError(f"exit code {code}, see {log_path}")
+    missing = [p for p in stage.outputs if not os.path.exists(p)]
+    if missing:
+        raise RuntimeError(f"finished without writing {', '.join(missing)}")
+
+    with lock:
+        state["stages"][stage.name] = {
+            "signature": signature,
+            "outputs": outputs_signature(stage, hasher),
+            "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration": round(duration, 1)
+        }
+        write_json(STATE_FILE, state)
+    return "done", duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the remediation pipeline as a DAG of stages, skipping unchanged ones")
+    parser.add_argument("--data-dir", required=True, help="scan tree (Axe JSON reports + HTML pages); extraction writes here")
+    parser.add_argument("--work-dir", default=".", help="experiment folder; every other file is read and written here")
+    parser.add_argument("--jobs", type=int, default=2, help="stages run at the same time")
+    parser.add_argument("--only", nargs="+", default=None, help="run just these stages (their inputs must exist)")
+    parser.add_argument("--until", nargs="+", default=None, help="run these stages and everything they depend on")
+    parser.add_argument("--force", nargs="*", default=None, help="rerun these stages even if unchanged (no names: all)")
+    parser.add_argument("--args", action="append", default=[], metavar="STAGE=ARGS",
+                        help='extra command-line arguments for a stage, e.g. generate_fix="--batch --limit 100"')
+    parser.add_argument("--dry-run", action="store_true", help="only report what would run")
+    parser.add_argument("--list", action="store_true", help="print the stages and their dependencies")
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir)
+    os.makedirs(args.work_dir, exist_ok=True)
+    os.chdir(args.work_dir)
+
+    stages = define_stages(data_dir)
+    by_name = {stage.name: stage for stage in stages}
+    deps = dependencies(stages)
+
+    if args.list:
+        for stage in stages:
+            after = f" <- {', '.join(deps[stage.name])}" if deps[stage.name] else ""
+            print(f"{stage.name}{after}")
+        return
+
+    extra_args = {}
+    for item in args.args:
+        name, _, value = item.partition("=")
+        if name not in by_name:
+            parser.error(f"unknown stage in --args: {name}")
+        extra_args[name] = shlex.split(value)
+
+    for name in (args.only or []) + (args.until or []) + (args.force or []):
+        if name not in by_name:
+            parser.error(f"unknown stage: {name}")
+    selected = set(by_name)
+    if args.until:
+        selected = upstream(deps, args.until)
+    if args.only:
+        selected = set(args.only)
+    forced = set(by_name) if args.force == [] else set(args.force or [])
+
+    state = {"stages": {}, "hashes": {}}
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state.update(json.load(f))
+    os.makedirs(LOG_DIR, exist_ok=True)
+    lock = threading.RLock()
+    hasher = Hasher(state["hashes"], lock)
+    # Outputs of any stage never count as inputs of a folder (extraction writes into the scan tree)
+    exclude = {os.path.normpath(os.path.abspath(p)) for stage in stages for p in stage.outputs}
+    env = dict(os.environ, PIPELINE_DATA_DIR=data_dir, PIPELINE_EXPERIMENT_DIR=os.getcwd())
+
+    print(f"🧭 Pipeline: {len(selected)} of {len(stages)} stages, up to {args.jobs} at a time")
+    status = {}
+    pending = [stage.name for stage in stages if stage.name in selected]
+    running = {}
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                wait_for = [d for d in deps[name] if d in selected]
+                if any(status.get(d) in ("failed", "blocked") for d in wait_for):
+                    status[name] = "blocked"
+                    pending.remove(name)
+                    print(f"⏸️ {name}: blocked by {', '.join(d for d in wait_for if status.get(d) in ('failed', 'blocked'))}")
+                elif args.dry_run and any(status.get(d) == "would run" for d in wait_for):
+                    status[name] = "would run"
+                    pending.remove(name)
+                    print(f"🔸 {name}: would run")
+                elif all(d in status for d in wait_for):
+                    pending.remove(name)
+                    running[pool.submit(run_stage, by_name[name], extra_args.get(name, []), state, hasher,
+                                        exclude, env, lock, args.dry_run, name in forced)] = name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    result, duration = future.result()
+                    status[name] = result
+                    if result == "skipped":
+                        print(f"⏭️ {name}: unchanged, skipped")
+                    elif result == "would run":
+                        print(f"🔸 {name}: would run")
+                    else:
+                        print(f"✅ {name}: done in {duration:.1f}s")
+                except MissingInput as e:
+                    status[name] = "failed"
+                    print(f"❌ {name}: missing input {e}")
+                except Exception as e:
+                    status[name] = "failed"
+                    print(f"❌ {name}: {e}")
+
+    with lock:
+        write_json(STATE_FILE, state)
+    counts = {}
+    for result in status.values():
+        counts[result] = counts.get(result, 0) + 1
+    print(f"🏁 {', '.join(f'{n} {r}' for r, n in counts.items())} in {time.time() - started:.1f}s")
+    if any(result in ("failed", "blocked") for result in status.values()):
+        print(f"♻️ Rerun the same command to resume; finished stages are skipped (state in {STATE_FILE})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import re
+from functools import lru_cache
+from bs4 import BeautifulSoup, Comment
+
+# === Per-prompt token budget ===
+# Token counts come from one cached tiktoken encoder (len/4 estimate when
+# tiktoken is missing). Oversized snippets are trimmed structurally: the flagged
+# element keeps its tag and identifying/ARIA attributes while its subtree is
+# collapsed step by step, so the model still sees what it has to fix. A snippet
+# is never trimmed below that start tag with its id/role/aria-* attributes.
+
+TOKENIZER_MODEL = "gpt-4"
+KEEP_ATTRS = {"id", "role", "name", "type", "href", "src", "alt", "title", "for", "tabindex", "lang", "class"}
+TEXT_WORDS = 12
+
+_WHITESPACE = re.compile(r"\s+")
+_OMITTED = re.compile(r"^ (\d+) (?:more )?element\(s\) omitted $")
+
+
+@lru_cache(maxsize=1)
+def encoder():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    text = str(text or "")
+    enc = encoder()
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _short_text(text):
+    words = _WHITESPACE.sub(" ", text).strip().split(" ")
+    return " ".join(words[:TEXT_WORDS]) + (" …" if len(words) > TEXT_WORDS else "")
+
+
+def _keep_attr(name):
+    return name in KEEP_ATTRS or name.startswith("aria-")
+
+
+# (depth, children kept per element) for each successive trimming step
+TRIM_STEPS = [(3, None), (2, None), (2, 10), (1, 10), (1, 3), (0, 0)]
+
+
+def _collapse(tag, depth, max_children, sizes):
+    # Subtrees below `depth` and children beyond `max_children` become a comment
+    # saying how many elements were dropped (sizes come from the untrimmed tree)
+    children = tag.find_all(True, recursive=False)
+    if max_children is not None and len(children) > max_children:
+        extra = children[max_children:]
+        more = "more " if max_children else ""
+        extra[0].insert_before(Comment(f" {sum(sizes.get(id(c), 1) for c in extra)} {more}element(s) omitted "))
+        for child in extra:
+            child.extract()
+        children = children[:max_children]
+    for child in children:
+        if depth <= 0:
+            child.replace_with(Comment(f" {sizes.get(id(child), 1)} element(s) omitted "))
+        else:
+            _collapse(child, depth - 1, max_children, sizes)
+    for text in tag.find_all(string=True, recursive=False):
+        if not isinstance(text, Comment) and text.strip():
+            text.replace_with(_short_text(text))
+
+
+def _merge_omitted(root):
+    # Runs of adjacent "N element(s) omitted" comments become a single comment
+    for tag in [root] + root.find_all(True):
+        run = []
+        for node in list(tag.contents) + [None]:
+            match = _OMITTED.match(node) if isinstance(node, Comment) else None
+            if match:
+                run.append((node, int(match.group(1))))
+                continue
+            if len(run) > 1:
+                run[0][0].replace_with(Comment(f" {sum(n for _, n in run)} element(s) omitted "))
+                for comment, _ in run[1:]:
+                    comment.extract()
+            run = []
+
+
+def _trim_steps(html):
+    # Progressively smaller structural versions of the snippet
+    soup = BeautifulSoup(html, "html.parser")
+    root = soup.find()
+    if root is None:
+        return
+    sizes = {id(tag): len(tag.find_all(True)) + 1 for tag in root.find_all(True)}
+    for depth, max_children in TRIM_STEPS:
+        _collapse(root, depth, max_children, sizes)
+        _merge_omitted(root)
+        yield str(root)
+    root.attrs = {k: v for k, v in root.attrs.items() if _keep_attr(k)}
+    yield str(root)
+    root.attrs = {k: v for k, v in root.attrs.items() if k in ("id", "role") or k.startswith("aria-")}
+    yield str(root)
+    root.clear()
+    yield str(root)
+
+
+def trim_snippet(html, max_tokens):
+    # Returns (snippet, trimmed?): the largest structural version within max_tokens,
+    # else the smallest one (bare root start tag); callers check whether it fits
+    if count_tokens(html) <= max_tokens:
+        return html, False
+    candidate = html
+    for candidate in _trim_steps(html):
+        if count_tokens(candidate) <= max_tokens:
+            return candidate, True
+    return candidate, candidate != html
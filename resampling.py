@@ -0,0 +1,196 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# === Bootstrap confidence intervals and paired permutation tests ===
+# All resamples are drawn as one matrix per chunk and reduced with matrix
+# products: a chunk of bootstrap resamples becomes a (resamples x rows) count
+# matrix W, and every statistic is computed from W @ X, the resampled sums of a
+# few columns (a, b, d = a - b, d², success flags). Paired rows are resampled
+# together. When rows repeat a lot (compliance ratios of small violation counts,
+# 0/1 success flags), the distinct rows are resampled with multinomial counts,
+# which has the same distribution as drawing row indices and costs
+# resamples x distinct rows instead of resamples x rows. A multinomial draw costs
+# about ten index draws, so continuous scores (distinct rows close to n) are
+# resampled by index; that is ~1.5 ms per resample per 100k rows and core, so
+# chunks run on a thread pool (the NumPy draws, bincount and matmul release the GIL).
+# Draws come from one generator per block of BLOCK resamples seeded with
+# (seed, block number), so results depend on the seed only, not on chunk_size
+# or workers.
+
+DEFAULT_RESAMPLES = 10000
+DEFAULT_SEED = 42
+CONFIDENCE = 0.95
+BLOCK = 64
+MAX_CHUNK_CELLS = 1 << 24  # resamples x rows in flight, over all workers (~130 MB of int64 indices)
+COMPRESS_RATIO = 0.1       # resample distinct rows when there are at most rows / 10 of them
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def _generators(resamples, seed):
+    for start in range(0, resamples, BLOCK):
+        yield start, min(BLOCK, resamples - start), np.random.default_rng([seed, start // BLOCK])
+
+
+def _chunks(resamples, width, seed, chunk_size=None, workers=1):
+    # Groups of (offset, size, rng) blocks, each group at most chunk_size resamples
+    if chunk_size is None:
+        chunk_size = MAX_CHUNK_CELLS // (max(width, 1) * workers)
+    chunk_size = max(BLOCK, chunk_size // BLOCK * BLOCK)
+    group = []
+    for block in _generators(resamples, seed):
+        group.append(block)
+        if len(group) * BLOCK >= chunk_size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def _map(fn, groups, workers):
+    if workers > 1 and len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(fn, groups))
+    return [fn(group) for group in groups]
+
+
+def compress_rows(matrix):
+    # Distinct rows and their multiplicities, when that shrinks the data enough
+    unique, counts = np.unique(matrix, axis=0, return_counts=True)
+    if len(unique) > COMPRESS_RATIO * len(matrix):
+        return matrix, None
+    return unique, counts
+
+
+# === Bootstrap: resampled column sums, (resamples x columns) ===
+def bootstrap_sums(matrix, resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, chunk_size=None, workers=None):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    out = np.zeros((resamples, matrix.shape[1]))
+    if n == 0:
+        return out
+    rows, weights = compress_rows(matrix)
+    workers = workers or DEFAULT_WORKERS
+
+    def chunk(group):
+        size = sum(b[1] for b in group)
+        if weights is not None:
+            counts = np.concatenate([rng.multinomial(n, weights / n, size=b) for _, b, rng in group])
+        else:
+            index = np.concatenate([rng.integers(0, n, size=(b, n)) for _, b, rng in group])
+            index += (np.arange(size) * n)[:, None]
+            counts = np.bincount(index.ravel(), minlength=size * n).reshape(size, n)
+            del index
+        start = group[0][0]
+        out[start:start + size] = counts @ rows
+
+    _map(chunk, list(_chunks(resamples, len(rows), seed, chunk_size, workers)), workers)
+    return out
+
+
+# === Paired sign-flip permutation test on the mean difference ===
+def permutation_test(differences, resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, chunk_size=None, workers=None):
+    # Under H0 each pair's difference is equally likely to have either sign.
+    # Two-sided p = (1 + #{|T*| >= |T|}) / (resamples + 1), T = sum of differences
+    d = np.asarray(differences, dtype=np.float64)
+    d = d[~np.isnan(d)]
+    observed = abs(d.sum())
+    magnitudes = np.abs(d[d != 0])
+    values, counts = np.unique(magnitudes, return_counts=True)
+    compressed = len(values) <= COMPRESS_RATIO * max(len(magnitudes), 1)
+    width = len(values) if compressed else len(magnitudes)
+    tolerance = 1e-9 * max(observed, 1.0)
+    workers = workers or DEFAULT_WORKERS
+
+    def chunk(group):
+        if compressed:
+            # Positive signs among the pairs sharing each |d|: Binomial(count, 1/2)
+            positive = np.concatenate([rng.binomial(counts, 0.5, size=(b, width)) for _, b, rng in group])
+            totals = (2 * positive - counts) @ values
+        else:
+            signs = np.concatenate([rng.integers(0, 2, size=(b, width), dtype=np.int8) for _, b, rng in group])
+            totals = 2 * (signs @ magnitudes) - magnitudes.sum()
+        return int((np.abs(totals) >= observed - tolerance).sum())
+
+    extreme = sum(_map(chunk, list(_chunks(resamples, width, seed, chunk_size, workers)), workers))
+    return (1 + extreme) / (resamples + 1)
+
+
+def percentile_ci(samples, confidence=CONFIDENCE):
+    alpha = (1 - confidence) / 2
+    low, high = np.nanpercentile(samples, [alpha * 100, (1 - alpha) * 100])
+    return [float(low), float(high)]
+
+
+def cohens_d(a, b):
+    # Paired effect size: mean difference over the standard deviation of the differences
+    diff = np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
+    std_diff = np.std(diff, ddof=1)
+    return 0.0 if std_diff == 0 else float(np.mean(diff) / std_diff)
+
+
+# === CoT vs RAG (or any two paired strategies) ===
+def paired_comparison(a, b, success_a=None, success_b=None, resamples=DEFAULT_RESAMPLES,
+                      seed=DEFAULT_SEED, chunk_size=None, confidence=CONFIDENCE, workers=None):
+    # a, b: paired scores (rows with a missing score are dropped); success_*: optional 0/1 flags
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    keep = ~(np.isnan(a) | np.isnan(b))
+    columns = {"a": a[keep], "b": b[keep]}
+    if success_a is not None and success_b is not None:
+        columns["success_a"] = np.asarray(success_a, dtype=np.float64)[keep]
+        columns["success_b"] = np.asarray(success_b, dtype=np.float64)[keep]
+    n = int(keep.sum())
+    d = columns["a"] - columns["b"]
+    names = list(columns) + ["d2"]
+    matrix = np.column_stack(list(columns.values()) + [d * d])
+
+    if n < 2:
+        # Nothing to resample: point estimates where defined, no intervals or p-values
+        def point(values):
+            return {"estimate": float(values.mean()) if n else None, "ci": None}
+
+        result = {
+            "n": n, "resamples": resamples, "seed": seed, "confidence": confidence,
+            "mean_a": point(columns["a"]), "mean_b": point(columns["b"]), "mean_difference": point(d),
+            "cohens_d": {"estimate": None, "ci": None},
+            "permutation_p": {"mean_difference": None}
+        }
+        if "success_a" in columns:
+            result["success_rate_a"] = point(columns["success_a"])
+            result["success_rate_b"] = point(columns["success_b"])
+            result["success_rate_difference"] = point(columns["success_a"] - columns["success_b"])
+            result["permutation_p"]["success_rate_difference"] = None
+        return result
+
+    sums = bootstrap_sums(matrix, resamples, seed, chunk_size, workers)
+    col = {name: sums[:, i] for i, name in enumerate(names)}
+    mean_diff = (col["a"] - col["b"]) / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_diff = (col["d2"] - n * mean_diff ** 2) / (n - 1)
+        boot_d = np.where(var_diff > 0, mean_diff / np.sqrt(np.clip(var_diff, 0, None)), 0.0)
+
+    def summary(estimate, samples):
+        return {"estimate": float(estimate), "ci": percentile_ci(samples, confidence)}
+
+    result = {
+        "n": n,
+        "resamples": resamples,
+        "seed": seed,
+        "confidence": confidence,
+        "mean_a": summary(columns["a"].mean(), col["a"] / n),
+        "mean_b": summary(columns["b"].mean(), col["b"] / n),
+        "mean_difference": summary(d.mean(), mean_diff),
+        "cohens_d": summary(cohens_d(columns["a"], columns["b"]), boot_d),
+        "permutation_p": {"mean_difference": permutation_test(d, resamples, seed + 1, chunk_size, workers)}
+    }
+    if "success_a" in columns:
+        result["success_rate_a"] = summary(columns["success_a"].mean(), col["success_a"] / n)
+        result["success_rate_b"] = summary(columns["success_b"].mean(), col["success_b"] / n)
+        result["success_rate_difference"] = summary(
+            columns["success_a"].mean() - columns["success_b"].mean(), (col["success_a"] - col["success_b"]) / n
+        )
+        result["permutation_p"]["success_rate_difference"] = permutation_test(
+            columns["success_a"] - columns["success_b"], resamples, seed + 2, chunk_size, workers
+        )
+    return result
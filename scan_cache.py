@@ -0,0 +1,97 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# === On-disk cache of Axe rescan results ===
+# Keyed on a hash of the normalised wrapped document plus the axe-core build
+# and run options, so LLM responses that only differ in whitespace (across rows
+# or between CoT and RAG) are scanned once. Entries are evicted least recently
+# used first once the stored results exceed max_bytes. Several rescans (e.g.
+# one per strategy) may share one cache file concurrently.
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_TITLE = re.compile(r"<title>.*?</title>", re.S | re.I)
+_BETWEEN_TAGS = re.compile(r">\s+<")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_document(html):
+    # The per-row <title> sits outside the scanned main#axe-scan-target
+    html = _TITLE.sub("", html, count=1)
+    html = _BETWEEN_TAGS.sub("><", html)
+    return _WHITESPACE.sub(" ", html).strip()
+
+
+def scan_key(html, axe_build, options=None):
+    digest = hashlib.sha256()
+    digest.update(axe_build.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(options or {}, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_document(html).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ScanCache:
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS scans (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scans_last_used ON scans (last_used);
+        """)
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT result FROM scans WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE scans SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, result):
+        payload = json.dumps(result, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO scans (key, result, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time())
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM scans").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM scans ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM scans WHERE key = ?", (key,))
+            total -= size
+            self.evicted += 1
+
+    def close(self):
+        self.conn.close()
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"{self.hits:,} hits / {self.misses:,} misses ({rate:.1f}% hit rate), {self.evicted:,} evicted"
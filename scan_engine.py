@@ -0,0 +1,220 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from axe_stream import iter_rules, critical_rule_filter
+from scan_manifest import file_digest
+
+# === Shared scan engine for the Axe report corpus ===
+# One os.scandir pass discovers reports and HTML pages together, report parsing
+# is spread over a process pool with a bounded number of files in flight, and
+# results come back in the same order os.walk would have produced them.
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+
+def normalize_key(filename):
+    return os.path.splitext(filename)[0].lower().replace("www.", "").replace("-", "").replace("_", "")
+
+
+# === Single-pass directory walk (same visiting order as os.walk, top-down) ===
+def iter_files(root_path):
+    stack = [root_path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            else:
+                yield current, entry.name
+
+        stack.extend(reversed(subdirs))
+
+
+# === Per-file worker for extraction.py (runs in the process pool) ===
+EXTRACTION_SECTIONS = ["violations", "incomplete", "inapplicable"]
+
+
+def extract_critical(file_path, filename, wcag_rules):
+    # Only critical rules from WCAG_RULES are decoded; sections are regrouped in
+    # the fixed order above whatever order they have in the report.
+    by_section = {section: [] for section in EXTRACTION_SECTIONS}
+    try:
+        for section, violation in iter_rules(file_path, EXTRACTION_SECTIONS, critical_rule_filter(wcag_rules)):
+            by_section[section].append(violation)
+    except Exception:
+        return None
+
+    entries = []
+    critical_131 = 0
+    critical_412 = 0
+
+    for section in EXTRACTION_SECTIONS:
+        for violation in by_section[section]:
+            rule_id = violation["id"].lower()
+            impact = violation["impact"].lower()
+            nodes = violation.get("nodes", [])
+            html = nodes[0].get("html", "") if nodes else ""
+            target = nodes[0].get("target", "") if nodes else ""
+
+            for sc, sc_data in wcag_rules.items():
+                if rule_id in sc_data["rules"]:
+                    if sc == "1.3.1":
+                        critical_131 += 1
+                    elif sc == "4.1.2":
+                        critical_412 += 1
+
+                    entries.append({
+                        "file": filename,
+                        "rule_id": rule_id,
+                        "impact": impact,
+                        "WCAG_SC": sc,
+                        "html": html,
+                        "target": target
+                    })
+
+    counts = {
+        "file": filename,
+        "critical_1.3.1": critical_131,
+        "critical_4.1.2": critical_412,
+        "total_critical": critical_131 + critical_412
+    }
+    return {"entries": entries, "counts": counts}
+
+
+# === Manifest-aware wrapper: hash first, only parse when the content changed ===
+def _parse_if_changed(parse_report, file_path, filename, known_sha256, args):
+    try:
+        stat = os.stat(file_path)
+        sha256 = file_digest(file_path)
+    except OSError:
+        # Broken symlink, unreadable or deleted mid-crawl: let the parser report it
+        # exactly as without a manifest, and keep it out of the manifest
+        return {"unreadable": True, "result": parse_report(file_path, filename, *args)}
+    record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256, "changed": sha256 != known_sha256}
+    if record["changed"]:
+        record["result"] = parse_report(file_path, filename, *args)
+    return record
+
+
+# === Per-file worker for helper scripts/pre_violation_count.py ===
+def count_critical_nodes(file_path, filename, wcag_rules):
+    try:
+        violations = [violation for _, violation in iter_rules(
+            file_path, ["violations"], critical_rule_filter(wcag_rules), top_level=True
+        )]
+    except Exception as e:
+        return {"error": str(e), "rows": []}
+
+    rows = []
+    wcag_131 = 0
+    wcag_412 = 0
+
+    for violation in violations:
+        rule_id = violation.get("id", "").lower()
+        impact = violation.get("impact", "")
+        tags = violation.get("tags", [])
+
+        nodes = violation.get("nodes", [])
+        for node in nodes:
+            html = node.get("html", "")
+            target = node.get("target", [""])[0] if isinstance(node.get("target", []), list) else node.get("target", "")
+
+            for sc, sc_data in wcag_rules.items():
+                if rule_id in sc_data["rules"]:
+                    if sc == "1.3.1":
+                        wcag_131 += 1
+                    elif sc == "4.1.2":
+                        wcag_412 += 1
+
+                    rows.append({
+                        "file": filename,
+                        "rule_id": rule_id,
+                        "impact": impact,
+                        "wcag_1.3.1": wcag_131,
+                        "wcag_4.1.2": wcag_412,
+                        "html": html,
+                        "target": target,
+                        "violation_count": len(nodes),
+                        "tags": ", ".join(tags)
+                    })
+
+    return {"error": None, "rows": rows}
+
+
+# === Scan a tree: pair reports with HTML pages and parse reports in parallel ===
+def scan_tree(root_path, parse_report, report_ext=".json", args=(), workers=DEFAULT_WORKERS,
+              max_in_flight=None, accept=None, manifest=None):
+    if max_in_flight is None:
+        max_in_flight = workers * 4
+
+    html_lookup = {}
+    reports = []
+    results = {}
+
+    def collect(done):
+        for future in done:
+            index = in_flight.pop(future)
+            if manifest is None:
+                results[index] = future.result()
+                continue
+            file_path = reports[index][1]
+            record = future.result()
+            if record.get("unreadable"):
+                results[index] = record["result"]
+            elif record["changed"]:
+                manifest.store(file_path, record["size"], record["mtime_ns"], record["sha256"], record["result"])
+                results[index] = record["result"]
+            else:
+                results[index] = manifest.reuse(file_path, record["size"], record["mtime_ns"])
+
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for subdir, filename in iter_files(root_path):
+            if filename.endswith(".html"):
+                html_lookup[normalize_key(filename)] = os.path.join(subdir, filename)
+                continue
+            if not filename.endswith(report_ext):
+                continue
+            if accept is not None and not accept(filename):
+                continue
+
+            file_path = os.path.join(subdir, filename)
+            index = len(reports)
+            reports.append((filename, file_path))
+
+            if manifest is not None:
+                hit, cached, known_sha256 = manifest.lookup(file_path)
+                if hit:
+                    results[index] = cached
+                    continue
+
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            if manifest is None:
+                future = pool.submit(parse_report, file_path, filename, *args)
+            else:
+                future = pool.submit(_parse_if_changed, parse_report, file_path, filename, known_sha256, args)
+            in_flight[future] = index
+
+        collect(list(in_flight))
+
+    if manifest is not None:
+        manifest.finish()
+
+    # HTML pages found later in the walk still win, exactly as with a full lookup pass
+    for index, (filename, file_path) in enumerate(reports):
+        html_path = html_lookup.get(normalize_key(filename), "")
+        yield filename, file_path, html_path, results[index]
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+
+# === Persistent manifest of parsed Axe reports ===
+# Each report is keyed by path and remembered with its size, mtime and SHA-256.
+# A file whose size and mtime are unchanged is served from the cache without
+# being opened; if only the mtime moved, the content hash decides. Rows for
+# files that disappeared from the corpus are dropped at the end of a run.
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# === Extraction signature: worker source + configuration ===
+# Cached results are only valid for the code that produced them, so the
+# signature hashes the worker's module and the project modules it imports
+# functions from (e.g. axe_stream for scan_engine) alongside the rules.
+def worker_signature(worker, config):
+    module = sys.modules[worker.__module__]
+    base_dir = os.path.dirname(os.path.abspath(module.__file__))
+    sources = {os.path.abspath(module.__file__)}
+    for value in vars(module).values():
+        dependency = sys.modules.get(getattr(value, "__module__", None) or "")
+        dependency_file = getattr(dependency, "__file__", None)
+        if dependency_file and os.path.dirname(os.path.abspath(dependency_file)) == base_dir:
+            sources.add(os.path.abspath(dependency_file))
+
+    digest = hashlib.sha256()
+    for source in sorted(sources):
+        digest.update(os.path.basename(source).encode("utf-8"))
+        digest.update(file_digest(source).encode("ascii"))
+    return f"{worker.__name__}:{digest.hexdigest()}:" + json.dumps(config, sort_keys=True)
+
+
+class ScanManifest:
+    def __init__(self, db_path, signature=""):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS reports (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                result TEXT,
+                run_id INTEGER NOT NULL
+            );
+        """)
+
+        # A different extraction signature (rules, worker) invalidates every cached row
+        if self._get_meta("signature") != signature:
+            self.conn.execute("DELETE FROM reports")
+            self._set_meta("signature", signature)
+
+        self.run_id = int(self._get_meta("run_id") or 0) + 1
+        self._set_meta("run_id", str(self.run_id))
+        self.hits = 0
+        self.misses = 0
+        self.removed = 0
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def lookup(self, file_path):
+        # Returns (hit, cached_result, known_sha256)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False, None, None
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha256, result FROM reports WHERE path = ?", (file_path,)
+        ).fetchone()
+        if row is None:
+            return False, None, None
+        size, mtime_ns, sha256, result = row
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+            self.conn.execute("UPDATE reports SET run_id = ? WHERE path = ?", (self.run_id, file_path))
+            self.hits += 1
+            return True, json.loads(result), sha256
+        return False, None, sha256
+
+    def reuse(self, file_path, size, mtime_ns):
+        # Content unchanged although size/mtime moved: refresh the stat, keep the rows
+        self.conn.execute(
+            "UPDATE reports SET size = ?, mtime_ns = ?, run_id = ? WHERE path = ?",
+            (size, mtime_ns, self.run_id, file_path)
+        )
+        self.hits += 1
+        row = self.conn.execute("SELECT result FROM reports WHERE path = ?", (file_path,)).fetchone()
+        return json.loads(row[0])
+
+    def store(self, file_path, size, mtime_ns, sha256, result):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO reports (path, size, mtime_ns, sha256, result, run_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (file_path, size, mtime_ns, sha256, json.dumps(result, ensure_ascii=False), self.run_id)
+        )
+        self.misses += 1
+
+    def finish(self):
+        cursor = self.conn.execute("DELETE FROM reports WHERE run_id != ?", (self.run_id,))
+        self.removed = cursor.rowcount
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def summary(self):
+        return f"{self.hits:,} cached, {self.misses:,} parsed, {self.removed:,} removed"
@@ -0,0 +1,49 @@
+import re
+import hashlib
+from bs4 import BeautifulSoup
+
+# === Canonicalise violation snippets and group identical ones ===
+# The same fragment (shared theme icons, CMS widgets) is flagged on hundreds of
+# pages. Rows whose canonical snippet, rule ID and failure summary agree get one
+# prompt and one LLM call, and the fix is copied back to every member row.
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def canonical_snippet(html):
+    # Parsed and re-serialised: attribute order, quoting and whitespace no longer matter
+    soup = BeautifulSoup(html or "", "html.parser")
+    for tag in soup.find_all(True):
+        tag.attrs = {
+            k: (" ".join(v) if isinstance(v, list) else v)
+            for k, v in sorted(tag.attrs.items())
+        }
+    return _WHITESPACE.sub(" ", str(soup)).replace("> <", "><").strip()
+
+
+def dedup_key(html, rule_id, issues):
+    digest = hashlib.sha1()
+    digest.update(str(rule_id).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(canonical_snippet(html).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update("\n".join(sorted(set(issues))).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# keys in row order -> (group id per row, representative row per group)
+def assign_groups(keys):
+    group_of = {}
+    representatives = []
+    group_ids = []
+    for position, key in enumerate(keys):
+        if key not in group_of:
+            group_of[key] = len(representatives)
+            representatives.append(position)
+        group_ids.append(group_of[key])
+    return group_ids, representatives
+
+
+def compression_summary(rows, groups):
+    ratio = rows / groups if groups else 1.0
+    return f"{rows:,} rows -> {groups:,} unique groups ({ratio:.2f}x compression, {rows - groups:,} calls saved)"
@@ -0,0 +1,157 @@
+import hashlib
+import numpy as np
+import scipy.sparse as sp
+from functools import lru_cache
+from bs4 import BeautifulSoup
+
+# === Structural similarity of violation snippets ===
+# A snippet is reduced to tag/attribute shingles (tags, attribute names, the
+# values of role/type and enumerated aria-* attributes, parent>child edges).
+# Shingles are hashed into a sparse L2-normalised vector for k-means, and into
+# MinHash signatures for LSH banding: only snippets sharing a band bucket are
+# compared, so density clustering no longer needs the full pairwise matrix.
+
+HASH_DIM = 1 << 18
+NUM_PERM = 64
+LSH_BANDS = 16
+SIMILARITY_THRESHOLD = 0.8
+VALUE_ATTRS = {"role", "type"}
+# Free text and id references: only the attribute's presence is a feature
+FREE_TEXT_ATTRS = {
+    "aria-label", "aria-labelledby", "aria-describedby", "aria-details", "aria-controls", "aria-owns",
+    "aria-flowto", "aria-activedescendant", "aria-valuetext", "aria-placeholder", "aria-roledescription",
+    "aria-keyshortcuts", "aria-valuenow", "aria-valuemin", "aria-valuemax", "aria-posinset", "aria-setsize",
+    "aria-level", "aria-colindex", "aria-rowindex", "aria-colcount", "aria-rowcount", "aria-colspan", "aria-rowspan"
+}
+
+_PRIME = np.uint64(4294967311)  # > 2**32, so a*x + b stays within uint64
+
+
+@lru_cache(maxsize=1 << 16)
+def shingles(html):
+    soup = BeautifulSoup(html or "", "html.parser")
+    features = set()
+    for tag in soup.find_all(True):
+        features.add(f"t:{tag.name}")
+        parent = tag.parent.name if tag.parent is not None and tag.parent.name != "[document]" else "^"
+        features.add(f"e:{parent}>{tag.name}")
+        for attr, value in tag.attrs.items():
+            features.add(f"a:{tag.name}@{attr}")
+            if attr in VALUE_ATTRS or (attr.startswith("aria-") and attr not in FREE_TEXT_ATTRS):
+                value = " ".join(value) if isinstance(value, list) else value
+                features.add(f"v:{tag.name}@{attr}={value.strip().lower()}")
+    return frozenset(features)
+
+
+@lru_cache(maxsize=1 << 18)
+def feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# === Sparse hashed vectors (rows L2-normalised) ===
+def hashed_vectors(feature_sets, dim=HASH_DIM):
+    rows, cols = [], []
+    for row, features in enumerate(feature_sets):
+        for feature in features:
+            rows.append(row)
+            cols.append(feature_hash(feature) % dim)
+    data = np.ones(len(rows), dtype=np.float32)
+    matrix = sp.csr_matrix((data, (rows, cols)), shape=(len(feature_sets), dim))
+    matrix.sum_duplicates()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+# === Spherical k-means on sparse rows (k-means++ seeding, cosine similarity) ===
+def kmeans(matrix, k, iterations=25, seed=42, weights=None):
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+
+    centers = [rng.choice(n, p=weights / weights.sum())]
+    closest = np.full(n, np.inf)
+    for _ in range(1, k):
+        sims = matrix.dot(matrix[centers[-1]].T).toarray().ravel()
+        closest = np.minimum(closest, 1.0 - sims)
+        p = np.clip(closest, 0, None) * weights
+        if p.sum() == 0:
+            break
+        centers.append(rng.choice(n, p=p / p.sum()))
+    centroids = matrix[centers].toarray()
+
+    labels = np.zeros(n, dtype=np.int64)
+    for iteration in range(iterations):
+        new_labels = np.asarray(matrix.dot(centroids.T).argmax(axis=1)).ravel()
+        if iteration and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(len(centroids)):
+            members = labels == c
+            if not members.any():
+                continue
+            center = np.asarray(matrix[members].T.dot(weights[members])).ravel()
+            norm = np.linalg.norm(center)
+            if norm:
+                centroids[c] = center / norm
+    return labels
+
+
+# === MinHash + LSH banding ===
+def minhash_signatures(feature_sets, num_perm=NUM_PERM, seed=42):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    signatures = np.full((len(feature_sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for row, features in enumerate(feature_sets):
+        if not features:
+            continue
+        x = np.fromiter((feature_hash(f) & 0xFFFFFFFF for f in features), dtype=np.uint64, count=len(features))
+        signatures[row] = ((np.outer(a, x) + b[:, None]) % _PRIME).min(axis=1)
+    return signatures
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def lsh_clusters(signatures, bands=LSH_BANDS, threshold=SIMILARITY_THRESHOLD, weights=None):
+    # Connected components of "estimated Jaccard >= threshold" among LSH candidates.
+    # Each bucket is checked against its first member only (linear in bucket size).
+    # Returns a cluster id per row, -1 where a row has no neighbour (and weight < 2).
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    parent = list(range(n))
+    for band in range(bands):
+        chunk = signatures[:, band * rows:(band + 1) * rows]
+        buckets = {}
+        for i in range(n):
+            buckets.setdefault(chunk[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            head = members[0]
+            similarity = (signatures[members[1:]] == signatures[head]).mean(axis=1)
+            for other, score in zip(members[1:], similarity):
+                if score >= threshold:
+                    root_a, root_b = _find(parent, head), _find(parent, other)
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+
+    roots = [_find(parent, i) for i in range(n)]
+    sizes = {}
+    for i, root in enumerate(roots):
+        sizes[root] = sizes.get(root, 0) + (1 if weights is None else weights[i])
+    labels, ids = [], {}
+    for root in roots:
+        if sizes[root] < 2:
+            labels.append(-1)
+        else:
+            labels.append(ids.setdefault(root, len(ids)))
+    return np.array(labels, dtype=np.int64)
@@ -0,0 +1,70 @@
+import os
+import re
+import pandas as pd
+
+# === Prompt strategies and models under comparison ===
+# Every stage takes its strategy list from here (or from its --strategies flag)
+# instead of hardcoding cot/rag. A run may also use several models; each
+# (strategy, model) pair is an "arm" with its own columns, e.g. cot_response.
+# With a single model the arm is just the strategy, so existing files keep
+# their column names; otherwise it is <strategy>__<model slug>.
+# EVAL_STRATEGIES="cot,rag,few_shot" overrides the default list.
+
+DEFAULT_STRATEGIES = [s.strip() for s in os.environ.get("EVAL_STRATEGIES", "cot,rag").split(",") if s.strip()]
+LABELS = {"cot": "CoT", "rag": "RAG"}
+ARM_SEPARATOR = "__"
+
+_SLUG = re.compile(r"[^a-z0-9]+")
+
+
+def label(arm):
+    strategy, model = parse_arm(arm)
+    name = LABELS.get(strategy, strategy.replace("_", " ").title())
+    return f"{name} ({model})" if model else name
+
+
+def model_slug(model):
+    return _SLUG.sub("-", str(model).lower()).strip("-")
+
+
+def arm_id(strategy, model=None):
+    return f"{strategy}{ARM_SEPARATOR}{model_slug(model)}" if model else strategy
+
+
+def parse_arm(arm):
+    strategy, _, model = str(arm).partition(ARM_SEPARATOR)
+    return strategy, model or None
+
+
+def arms_in(columns, suffix, exclude=()):
+    # Arms present in a wide table, in column order (e.g. suffix "_response")
+    found = []
+    for column in columns:
+        column = str(column)
+        if column.endswith(suffix):
+            arm = column[:-len(suffix)]
+            if arm and arm not in exclude and arm not in found:
+                found.append(arm)
+    return found
+
+
+def order_arms(found):
+    # Configured strategies first, in their configured order, then anything else
+    rank = {s: i for i, s in enumerate(DEFAULT_STRATEGIES)}
+    return sorted(found, key=lambda a: (rank.get(parse_arm(a)[0], len(rank)), found.index(a)))
+
+
+# === Wide <-> long: {arm}_{field} columns <-> one row per (row, arm) ===
+def to_long(df, arm_list, fields, id_columns=()):
+    frames = []
+    for arm in arm_list:
+        strategy, model = parse_arm(arm)
+        frame = pd.DataFrame({"row": df.index, **{c: df[c].to_numpy() for c in id_columns}})
+        frame["arm"] = arm
+        frame["strategy"] = strategy
+        frame["model"] = model
+        for field in fields:
+            column = f"{arm}_{field}"
+            frame[field] = df[column].to_numpy() if column in df.columns else None
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
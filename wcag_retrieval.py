@@ -0,0 +1,221 @@
+import os
+import re
+import gzip
+import json
+import math
+import heapq
+import hashlib
+from collections import Counter, defaultdict
+from functools import lru_cache
+from bs4 import BeautifulSoup
+
+# === Local BM25 retrieval over WCAG Understanding / Techniques documents ===
+# Documents saved under wcag_docs/ (HTML, Markdown or text; the file name is the
+# document id, e.g. ARIA14.html, name-role-value.html) are split into
+# heading-scoped passages of ~120 words and indexed with BM25. The index is
+# stored next to the documents and rebuilt only when the files change. Queries
+# combine the rule id, its technique ids and the failure summary; passages from
+# the rule's own techniques are boosted. Results are memoised per
+# (rule_id, techniques, failure-summary signature).
+
+WCAG_DOCS_DIR = "wcag_docs"
+INDEX_FILE = "bm25_index.json.gz"
+DOC_EXTENSIONS = (".html", ".htm", ".md", ".txt")
+PASSAGE_WORDS = 120
+PASSAGE_OVERLAP = 30
+BM25_K1 = 1.5
+BM25_B = 0.75
+TECHNIQUE_BOOST = 1.5
+DEFAULT_TOP_K = 3
+MEMO_SIZE = 65536
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "if", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "which", "with", "must"
+}
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(str(text).lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part not in STOPWORDS)
+    return tokens
+
+
+# === Chunking ===
+def _sections(path):
+    # (heading, text) blocks of one document
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    if not path.endswith((".html", ".htm")):
+        heading, lines = "", []
+        for line in raw.splitlines():
+            if line.startswith("#"):
+                if lines:
+                    yield heading, " ".join(lines)
+                heading, lines = line.lstrip("#").strip(), []
+            elif line.strip():
+                lines.append(line.strip())
+        if lines:
+            yield heading, " ".join(lines)
+        return
+
+    soup = BeautifulSoup(raw, "html.parser")
+    for tag in soup(["script", "style", "nav", "header", "footer"]):
+        tag.decompose()
+    root = soup.find("main") or soup.body or soup
+    heading, parts = (soup.title.get_text(" ", strip=True) if soup.title else ""), []
+    for node in root.find_all(["h1", "h2", "h3", "h4", "p", "li", "pre", "td", "dd"]):
+        if node.name in ("h1", "h2", "h3", "h4"):
+            if parts:
+                yield heading, " ".join(parts)
+            heading, parts = node.get_text(" ", strip=True), []
+        elif not node.find_parent(["li", "pre", "td", "dd"]):
+            text = node.get_text(" ", strip=True)
+            if text:
+                parts.append(text)
+    if parts:
+        yield heading, " ".join(parts)
+
+
+def chunk_document(path, words=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP):
+    doc_id = os.path.splitext(os.path.basename(path))[0]
+    passages = []
+    for heading, text in _sections(path):
+        tokens = text.split()
+        step = max(1, words - overlap)
+        for start in range(0, max(1, len(tokens) - overlap), step):
+            passages.append({
+                "doc": doc_id,
+                "heading": heading,
+                "text": " ".join(tokens[start:start + words])
+            })
+    return passages
+
+
+def _doc_files(docs_dir):
+    return sorted(
+        os.path.join(docs_dir, name) for name in os.listdir(docs_dir)
+        if name.lower().endswith(DOC_EXTENSIONS)
+    )
+
+
+def corpus_signature(docs_dir):
+    digest = hashlib.sha256()
+    for path in _doc_files(docs_dir):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    digest.update(f"{PASSAGE_WORDS}:{PASSAGE_OVERLAP}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# === BM25 index ===
+class BM25Index:
+    def __init__(self, passages, postings, lengths, signature=None):
+        self.passages = passages
+        self.postings = postings  # term -> [[passage id, term frequency], ...]
+        self.lengths = lengths
+        self.signature = signature
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        n = len(passages)
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in postings.items()
+        }
+        self.by_doc = defaultdict(list)
+        for pid, passage in enumerate(passages):
+            self.by_doc[passage["doc"].upper()].append(pid)
+
+    @classmethod
+    def build(cls, docs_dir=WCAG_DOCS_DIR):
+        passages = []
+        for path in _doc_files(docs_dir):
+            passages.extend(chunk_document(path))
+        postings = defaultdict(list)
+        lengths = []
+        for pid, passage in enumerate(passages):
+            terms = Counter(tokenize(passage["heading"] + " " + passage["text"]))
+            lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                postings[term].append([pid, tf])
+        return cls(passages, dict(postings), lengths, corpus_signature(docs_dir))
+
+    def save(self, path):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump({
+                "signature": self.signature,
+                "passages": self.passages,
+                "postings": self.postings,
+                "lengths": self.lengths
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["passages"], data["postings"], data["lengths"], data.get("signature"))
+
+    def search(self, query, top_k=DEFAULT_TOP_K, boost_docs=()):
+        scores = defaultdict(float)
+        for term, qtf in Counter(tokenize(query)).items():
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for pid, tf in self.postings[term]:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[pid] / self.avg_length)
+                scores[pid] += qtf * idf * tf * (BM25_K1 + 1) / norm
+        boosted = {pid for doc in boost_docs for pid in self.by_doc.get(doc.upper(), ())}
+        for pid in boosted & scores.keys():
+            scores[pid] *= TECHNIQUE_BOOST
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.passages[pid], score) for pid, score in best]
+
+
+def load_index(docs_dir=WCAG_DOCS_DIR, rebuild=False):
+    # Cached on disk next to the documents; rebuilt when any document changes
+    if not os.path.isdir(docs_dir):
+        raise FileNotFoundError(f"WCAG documents folder not found: {docs_dir}")
+    path = os.path.join(docs_dir, INDEX_FILE)
+    signature = corpus_signature(docs_dir)
+    if not rebuild and os.path.exists(path):
+        index = BM25Index.load(path)
+        if index.signature == signature:
+            return index
+    index = BM25Index.build(docs_dir)
+    index.save(path)
+    return index
+
+
+# === Per-violation retrieval, memoised on rule + techniques + failure signature ===
+class Retriever:
+    def __init__(self, index, top_k=DEFAULT_TOP_K, max_words=80):
+        self.index = index
+        self.top_k = top_k
+        self.max_words = max_words
+        self.lookup = lru_cache(maxsize=MEMO_SIZE)(self._lookup)
+
+    def _lookup(self, rule_id, techniques, issues):
+        technique_ids = tuple(t.strip() for t in str(techniques).split(",") if t.strip())
+        query = " ".join([str(rule_id).replace("-", " "), " ".join(technique_ids), " ".join(issues)])
+        return tuple(self.index.search(query, self.top_k, boost_docs=technique_ids))
+
+    def passages(self, rule_id, techniques, issues):
+        return self.lookup(rule_id, techniques, tuple(sorted(set(issues))))
+
+    def context(self, rule_id, techniques, issues):
+        return self.format_context(self.passages(rule_id, techniques, issues))
+
+    def format_context(self, found):
+        # Prompt block: one line per (passage, score), cut to max_words
+        lines = []
+        for passage, _ in found:
+            words = passage["text"].split()
+            text = " ".join(words[:self.max_words]) + (" …" if len(words) > self.max_words else "")
+            heading = f" {passage['heading']}:" if passage["heading"] else ""
+            lines.append(f"- [{passage['doc']}]{heading} {text}")
+        return "Context:\n" + "\n".join(lines) + "\n" if lines else ""